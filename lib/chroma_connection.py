@@ -1,37 +1,191 @@
 import chromadb
 from chromadb.api import ClientAPI
 from chromadb.api.models.Collection import Collection
+from chromadb.config import Settings
 from dotenv import load_dotenv
+from collections import OrderedDict
 import os
-from typing import Dict
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from chromadb.errors import NotFoundError as _CollectionNotFound
+except ImportError:  # older chromadb raises ValueError for a missing collection
+    _CollectionNotFound = ValueError
 
 load_dotenv()
 
+# Handle cache: bounded LRU with TTL so thousands of tenants don't pin a
+# Collection object each forever. Evicted handles are just re-fetched.
+COLLECTION_CACHE_SIZE = int(os.getenv("CHROMA_COLLECTION_CACHE_SIZE", "512"))
+COLLECTION_CACHE_TTL = float(os.getenv("CHROMA_COLLECTION_CACHE_TTL", "900"))  # seconds, 0 = no expiry
+
+# Shared HTTP pool, sized for worker concurrency
+HTTP_MAX_CONNECTIONS = int(os.getenv("CHROMA_HTTP_MAX_CONNECTIONS", "64"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("CHROMA_HTTP_MAX_KEEPALIVE", "32"))
+HTTP_KEEPALIVE_SECS = float(os.getenv("CHROMA_HTTP_KEEPALIVE_SECS", "40"))
+
+# How long a list_collections() result is reused for namespace discovery
+NAMESPACE_LIST_TTL = float(os.getenv("CHROMA_NAMESPACE_LIST_TTL", "30"))
+
 _client: ClientAPI | None = None
-_permanent_collections: Dict[str, Collection] = {}
+_client_lock = threading.Lock()
+_permanent_collections: "OrderedDict[str, Tuple[Collection, float]]" = OrderedDict()
+_collections_lock = threading.Lock()
 _temporary_collection: Collection | None = None
 
+# coll_name -> ms spent in get_or_create_collection on the latest cold fetch
+_cold_fetch_ms: Dict[str, float] = {}
+# coll_name -> ms for handle fetch + first write in this process (cached collections only)
+_first_write_ms: Dict[str, float] = {}
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+_namespace_list: Tuple[float, List[Optional[str]]] | None = None
+
+def _client_settings() -> Settings:
+    return Settings(
+        chroma_http_max_connections=HTTP_MAX_CONNECTIONS,
+        chroma_http_max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        chroma_http_keepalive_secs=HTTP_KEEPALIVE_SECS,
+    )
+
 def get_chroma_client() -> ClientAPI:
     global _client
     if _client is None:
-        _client = chromadb.CloudClient(
-            api_key=os.getenv("CHROMA_API_KEY"),
-            tenant=os.getenv("CHROMA_TENANT"),
-            database=os.getenv("CHROMA_DATABASE")
-        )
+        with _client_lock:
+            if _client is None and os.getenv("CHROMA_HOST"):
+                # self-hosted / local Chroma (e.g. the load-test harness)
+                _client = chromadb.HttpClient(
+                    host=os.getenv("CHROMA_HOST"),
+                    port=int(os.getenv("CHROMA_PORT", "8000")),
+                    settings=_client_settings(),
+                )
+            elif _client is None:
+                _client = chromadb.CloudClient(
+                    api_key=os.getenv("CHROMA_API_KEY"),
+                    tenant=os.getenv("CHROMA_TENANT"),
+                    database=os.getenv("CHROMA_DATABASE"),
+                    settings=_client_settings(),
+                )
     return _client
 
+def _collection_name(base_collection: str, namespace: str | None) -> str:
+    return f"{base_collection}_{namespace}" if namespace else base_collection
+
+def _cached_collection(coll_name: str) -> Collection | None:
+    now = time.monotonic()
+    with _collections_lock:
+        entry = _permanent_collections.get(coll_name)
+        if entry is not None:
+            coll, fetched_at = entry
+            if COLLECTION_CACHE_TTL and now - fetched_at > COLLECTION_CACHE_TTL:
+                del _permanent_collections[coll_name]
+                _cache_stats["expired"] += 1
+            else:
+                _permanent_collections.move_to_end(coll_name)
+                _cache_stats["hits"] += 1
+                return coll
+        _cache_stats["misses"] += 1
+    return None
+
+def _cache_collection(coll_name: str, coll: Collection, elapsed_ms: float) -> None:
+    with _collections_lock:
+        _cold_fetch_ms[coll_name] = elapsed_ms
+        _permanent_collections[coll_name] = (coll, time.monotonic())
+        _permanent_collections.move_to_end(coll_name)
+        while len(_permanent_collections) > COLLECTION_CACHE_SIZE:
+            evicted, _ = _permanent_collections.popitem(last=False)
+            _cold_fetch_ms.pop(evicted, None)
+            _first_write_ms.pop(evicted, None)
+            _cache_stats["evictions"] += 1
+
 def get_permanent_collection(base_collection: str = "knowledge", namespace: str = None) -> Collection:
-    global _permanent_collections
-    client = get_chroma_client()
-    coll_name = f"{base_collection}_{namespace}" if namespace else base_collection
-    
-    if coll_name not in _permanent_collections:
-        _permanent_collections[coll_name] = client.get_or_create_collection(
-            name=coll_name,
-            metadata={"type": "permanent", "namespace": namespace}
-        )
-    return _permanent_collections[coll_name]
+    coll_name = _collection_name(base_collection, namespace)
+    coll = _cached_collection(coll_name)
+    if coll is not None:
+        return coll
+
+    # network round trip outside the lock so other namespaces aren't blocked
+    t0 = time.perf_counter()
+    coll = get_chroma_client().get_or_create_collection(
+        name=coll_name,
+        metadata={"type": "permanent", "namespace": namespace}
+    )
+    _cache_collection(coll_name, coll, (time.perf_counter() - t0) * 1000)
+    return coll
+
+def find_permanent_collection(base_collection: str = "knowledge", namespace: str = None) -> Collection | None:
+    """
+    Read-path lookup: the namespace's collection if it exists, else None.
+    Never creates, so arbitrary names from a query string can't add
+    collections; misses are not cached.
+    """
+    coll_name = _collection_name(base_collection, namespace)
+    coll = _cached_collection(coll_name)
+    if coll is not None:
+        return coll
+
+    t0 = time.perf_counter()
+    try:
+        coll = get_chroma_client().get_collection(name=coll_name)
+    except _CollectionNotFound:
+        return None
+    _cache_collection(coll_name, coll, (time.perf_counter() - t0) * 1000)
+    return coll
+
+def list_permanent_namespaces(base_collection: str = "knowledge") -> List[Optional[str]]:
+    """
+    Every namespace with a collection in Chroma (None for the base collection),
+    from list_collections(), reused for NAMESPACE_LIST_TTL seconds.
+    """
+    global _namespace_list
+    now = time.monotonic()
+    cached = _namespace_list
+    if cached is not None and now - cached[0] < NAMESPACE_LIST_TTL:
+        return list(cached[1])
+
+    prefix = f"{base_collection}_"
+    namespaces: List[Optional[str]] = []
+    for c in get_chroma_client().list_collections():
+        name = c if isinstance(c, str) else c.name  # names only on chromadb 0.6
+        if name == base_collection:
+            namespaces.append(None)
+        elif name.startswith(prefix):
+            namespaces.append(name[len(prefix):])
+    _namespace_list = (now, namespaces)
+    return list(namespaces)
+
+def prewarm_permanent_collections(namespaces: List[str], base_collection: str = "knowledge") -> Dict[str, float]:
+    """
+    Fetch handles for hot namespaces up front (e.g. at startup) so their first
+    write doesn't pay the get_or_create round trip. Returns ms per namespace.
+    """
+    timings: Dict[str, float] = {}
+    for ns in namespaces[:COLLECTION_CACHE_SIZE]:
+        t0 = time.perf_counter()
+        try:
+            get_permanent_collection(base_collection, ns)
+        except Exception:
+            continue  # a bad tenant shouldn't block startup
+        timings[ns] = (time.perf_counter() - t0) * 1000
+    return timings
+
+def record_first_write(coll_name: str, elapsed_ms: float) -> None:
+    # bounded by the handle cache: only cached collections are tracked
+    with _collections_lock:
+        if coll_name in _permanent_collections:
+            _first_write_ms.setdefault(coll_name, elapsed_ms)
+
+def collection_cache_stats() -> dict:
+    with _collections_lock:
+        return {
+            **_cache_stats,
+            "size": len(_permanent_collections),
+            "capacity": COLLECTION_CACHE_SIZE,
+            "ttl_secs": COLLECTION_CACHE_TTL,
+            "cold_fetch_ms": dict(_cold_fetch_ms),
+            "first_write_ms": dict(_first_write_ms),
+        }
 
 def get_temporary_collection() -> Collection:
     global _temporary_collection
@@ -42,4 +196,4 @@ def get_temporary_collection() -> Collection:
             metadata={"type": "temporary"}
         )
 
-    return _temporary_collection
\ No newline at end of file
+    return _temporary_collection
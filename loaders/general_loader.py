@@ -1,16 +1,68 @@
 
 from langchain_core.documents import Document
-from typing import Literal
+from typing import Dict, Iterable, Iterator, Literal
+import threading
+import time
 from .strategies.pdf_loader import load_pdf
 from .strategies.image_loader import  load_image_ocr
-from .strategies.text_loader import load_textlike, load_doclike_unstructured, TEXT_EXTS, DOC_EXTS
-from .strategies.web_loader import load_web_url, load_sitemap
+from .strategies.text_loader import load_textlike, load_doclike_unstructured, load_html, TEXT_EXTS, DOC_EXTS
+from .strategies.ooxml_loader import load_docx, load_pptx
+from .strategies.record_loader import RecordStreamLoader, RECORD_EXTS, is_json_array
+from .strategies.web_loader import load_web_url, load_sitemap, iter_sitemap_batches
 from .strategies.fallback_loader import load_any
-from utils.detect import sniff_bytes
+from utils.detect import sniff_file
 
-def _read_head(path: str, n: int=12) -> bytes:
-    with open(path, "rb") as f:
-        return f.read(n)
+# strategy -> {"count", "total_ms"}; sniffed files are keyed "sniff:<strategy>"
+# so their cost can be compared with the Unstructured "fallback" path
+_timings: Dict[str, Dict[str, float]] = {}
+_timings_lock = threading.Lock()
+
+def _record_timing(key: str, t0: float) -> None:
+    ms = (time.perf_counter() - t0) * 1000
+    with _timings_lock:
+        t = _timings.setdefault(key, {"count": 0, "total_ms": 0.0})
+        t["count"] += 1
+        t["total_ms"] += ms
+
+def _stream_records(docs: Iterator[Document]) -> Iterator[Document]:
+    # times only the loader's own work, not what the consumer does between docs
+    spent = 0.0
+    while True:
+        t = time.perf_counter()
+        d = next(docs, None)
+        spent += time.perf_counter() - t
+        if d is None:
+            break
+        yield d
+    _record_timing("records", time.perf_counter() - spent)
+
+def loader_timings() -> Dict[str, Dict[str, float]]:
+    with _timings_lock:
+        return {
+            k: {**v, "avg_ms": v["total_ms"] / v["count"] if v["count"] else 0.0}
+            for k, v in _timings.items()
+        }
+
+def _load_sniffed(path: str, pdf_strategy: str) -> tuple[list[Document], str]:
+    """Route a file with no/unknown extension by content to the cheapest loader."""
+    kind, encoding = sniff_file(path)
+    kind = kind or ""
+    if kind == "pdf":
+        return load_pdf(path, pdf_strategy, False), f"pdf:{pdf_strategy}"
+    if kind.startswith("image/"):
+        return load_image_ocr(path), "image"
+    try:
+        if kind == "docx":
+            return load_docx(path), "docx"
+        if kind == "pptx":
+            return load_pptx(path), "pptx"
+        if kind == "html":
+            return load_html(path, encoding), "html"
+        if kind == "text":
+            return load_textlike(path, encoding or "utf-8"), "text"
+    except Exception:
+        pass  # malformed for the fast path; let Unstructured try
+    return load_any(path), "fallback"
 
 def load_to_documents(
     *,
@@ -22,15 +74,29 @@ def load_to_documents(
     pdf_strategy:Literal["auto", "text", "table"] = "auto",
     sitemap: bool = False,
     source_label: str | None = None,
-) -> tuple[list[Document], str]:
+    checkpoint=None,            # IngestCheckpoint: commit sitemap pages batch by batch
+    fetch_batch_size: int = 20,
+    max_record_chars: int = 800,  # CSV/TSV/JSONL rows are grouped into Documents up to this size
+) -> tuple[Iterable[Document], str]:
     """
     Returns (docs, strategy_name)
     Creates LangChain Documents ONCE. No re-conversion later.
+    docs is a list, except for record files (csv/tsv/jsonl, JSON arrays), where it is a
+    lazy iterator so the caller can chunk and write them in bounded batches.
     """
+    t0 = time.perf_counter()
 
     if source_type == "url":
         assert url, "url required"
-        if sitemap:
+        if sitemap and checkpoint is not None:
+            # resume after the page batches a previous attempt already fetched
+            for batch in iter_sitemap_batches(url, 200, fetch_batch_size, checkpoint.fetch_batches):
+                for d in batch:
+                    d.metadata.setdefault("source", source_label or url)
+                checkpoint.commit_fetch_batch(batch)
+            docs = checkpoint.fetched_docs()
+            strategy = "sitemap"
+        elif sitemap:
             docs = load_sitemap(url, 200)
             strategy = "sitemap"
         else:
@@ -38,22 +104,33 @@ def load_to_documents(
             strategy = "web"
         for d in docs:
             d.metadata.setdefault("source", source_label or url)
+        _record_timing(strategy, t0)
         return docs, strategy
 
     if source_type == "text":
         assert text is not None, "text required"
         doc = Document(page_content=text, metadata={"filetype": "text", "source": source_label or "inline"})
+        _record_timing("text-inline", t0)
         return [doc], "text-inline"
 
     # files
     assert path, "path required for file"
     ext = (filename or "").lower().rsplit(".", 1)[-1] if filename and "." in filename else ""
+    sniffed = False
     if ext == "pdf":
         docs = load_pdf(path, pdf_strategy, False)
         strategy = f"pdf:{pdf_strategy}"
     elif ext in {"png","jpg","jpeg","gif","bmp","tiff","webp"}:
         docs = load_image_ocr(path)
         strategy = "image"
+    elif ext in RECORD_EXTS or (ext == "json" and is_json_array(path)):
+        # row-aware streaming; checked before TEXT_EXTS so csv/tsv/json arrays don't load as one blob
+        docs = RecordStreamLoader(
+            path,
+            max_chars=max_record_chars,
+            metadata={"source": source_label or (filename or path)},
+        ).lazy_load()
+        return _stream_records(docs), "records"
     elif ext in TEXT_EXTS:
         docs = load_textlike(path)
         strategy = "text"
@@ -61,18 +138,10 @@ def load_to_documents(
         docs = load_doclike_unstructured(path)
         strategy = "doclike"
     else:
-        # sniff header
-        head = _read_head(path, 12)
-        kind = sniff_bytes(head) or ""
-        if kind == "pdf":
-            docs = load_pdf(path, pdf_strategy, False)
-            strategy = f"pdf:{pdf_strategy}"
-        elif kind.startswith("image/"):
-            docs = load_image_ocr( path)
-            strategy = "image"
-        else:
-            docs = load_any(path)
-            strategy = "fallback"
+        # sniff content
+        docs, strategy = _load_sniffed(path, pdf_strategy)
+        sniffed = strategy != "fallback"
     for d in docs:
         d.metadata.setdefault("source", source_label or (filename or path))
+    _record_timing(f"sniff:{strategy}" if sniffed else strategy, t0)
     return docs, strategy
@@ -9,6 +9,7 @@ import os
 import shutil
 import json
 from pathlib import Path
+from utils.concurrency import stage
 
 Mode = Literal["auto", "elements", "unstructured"]
 
@@ -313,18 +314,20 @@ def load_image_ocr(
     Auto-selects mode by default (user only provides image).
     Always returns List[Document].
     """
-    try:
-        loader = ImageOCRLoader(
-            path,
-            mode=mode,
-            lang=lang,
-            psm=psm,
-            oem=oem,
-            tesseract_cmd=tesseract_cmd,
-        )
-        docs = loader.load()
-        for d in docs:
-            d.metadata.setdefault("filetype", "image")
-        return docs
-    except Exception as e:
-        raise RuntimeError(f"Failed to load image from {path} via OCR: {str(e)}") from e
+    loader = ImageOCRLoader(
+        path,
+        mode=mode,
+        lang=lang,
+        psm=psm,
+        oem=oem,
+        tesseract_cmd=tesseract_cmd,
+    )
+    # acquire outside the try so Overloaded isn't rewrapped as an OCR failure
+    with stage("ocr"):
+        try:
+            docs = loader.load()
+        except Exception as e:
+            raise RuntimeError(f"Failed to load image from {path} via OCR: {str(e)}") from e
+    for d in docs:
+        d.metadata.setdefault("filetype", "image")
+    return docs
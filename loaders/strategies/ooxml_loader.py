@@ -0,0 +1,42 @@
+from typing import List
+from langchain_core.documents import Document
+
+import re
+import zipfile
+from xml.etree import ElementTree as ET
+
+# Plain-text extraction straight from the OOXML package: no Unstructured, no
+# layout model. Enough for search; use load_doclike_unstructured for structure.
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_SLIDE_RE = re.compile(r"^ppt/slides/slide(\d+)\.xml$")
+
+
+def _paragraphs(root: ET.Element, para_tag: str, text_tag: str) -> List[str]:
+    out = []
+    for p in root.iter(para_tag):
+        text = "".join(t.text or "" for t in p.iter(text_tag)).strip()
+        if text:
+            out.append(text)
+    return out
+
+
+def load_docx(path: str) -> List[Document]:
+    with zipfile.ZipFile(path) as zf:
+        root = ET.fromstring(zf.read("word/document.xml"))
+    text = "\n".join(_paragraphs(root, f"{_W}p", f"{_W}t"))
+    return [Document(page_content=text, metadata={"source": path, "filetype": "docx"})]
+
+
+def load_pptx(path: str) -> List[Document]:
+    docs: List[Document] = []
+    with zipfile.ZipFile(path) as zf:
+        slides = sorted(
+            (int(m.group(1)), name) for name in zf.namelist() if (m := _SLIDE_RE.match(name))
+        )
+        for number, name in slides:
+            root = ET.fromstring(zf.read(name))
+            text = "\n".join(_paragraphs(root, f"{_A}p", f"{_A}t"))
+            if text:
+                docs.append(Document(page_content=text, metadata={"source": path, "filetype": "pptx", "page": number - 1}))
+    return docs
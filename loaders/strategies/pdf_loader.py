@@ -1,14 +1,165 @@
-from typing import List, Literal
+from typing import Dict, List, Literal, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyMuPDFLoader, PyPDFLoader, PDFPlumberLoader
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
 
-def load_pdf(path: str, strategy: Literal["auto","text","table"]="auto", extract_images: bool=False) -> List[Document]:
-    if strategy == "text":
-        docs = PyPDFLoader(path).load()
-    elif strategy == "table":
-        docs = PDFPlumberLoader(path, extract_images=False).load()
-    else:
-        docs = PyMuPDFLoader(path, extract_images=extract_images).load()
+import pymupdf
+import numpy as np
+
+from utils.concurrency import stage, stage_gate
+from .image_loader import _configure_tesseract, _preprocess_for_ocr, _extract_blocks
+
+# Pages whose text layer has fewer non-space chars than this are treated as scans
+OCR_MIN_CHARS = int(os.getenv("PDF_OCR_MIN_CHARS", "25"))
+# Render so the long side is ~ a letter page at 300 dpi, within sane DPI bounds
+OCR_TARGET_LONG_SIDE_PX = 3300
+OCR_MIN_DPI, OCR_MAX_DPI = 150, 400
+
+
+def _needs_ocr(doc: Document) -> bool:
+    return sum(not ch.isspace() for ch in (doc.page_content or "")) < OCR_MIN_CHARS
+
+
+def _ocr_dpi(page: "pymupdf.Page") -> int:
+    long_side_in = max(page.rect.width, page.rect.height) / 72
+    if long_side_in <= 0:
+        return OCR_MIN_DPI
+    return int(min(OCR_MAX_DPI, max(OCR_MIN_DPI, OCR_TARGET_LONG_SIDE_PX / long_side_in)))
+
+
+_ocr_pool: ProcessPoolExecutor | None = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    """
+    One process pool for all PDFs, sized by LIMIT_OCR. Workers come from a
+    forkserver (spawn on Windows) rather than fork(), which isn't safe from
+    the multithreaded server process.
+    """
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _ocr_pool = ProcessPoolExecutor(max_workers=stage_gate("ocr").limit, mp_context=ctx)
+        return _ocr_pool
+
+
+def _discard_ocr_pool(pool: ProcessPoolExecutor) -> None:
+    # a worker died: later PDFs get a fresh pool
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is pool:
+            _ocr_pool = None
+    pool.shutdown(wait=False)
+
+
+def _ocr_page(args: Tuple[str, int, str, str]) -> Tuple[str, dict]:
+    """Render one page in grayscale and OCR it. Runs in a worker process."""
+    path, page_no, lang, tesseract_cmd = args
+    _configure_tesseract(tesseract_cmd)
+    with pymupdf.open(path) as pdf:
+        page = pdf[page_no]
+        dpi = _ocr_dpi(page)
+        pix = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY)
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    blocks = _extract_blocks(_preprocess_for_ocr(img), lang=lang)
+    confs = [b["avg_conf"] for b in blocks if b["avg_conf"] >= 0]
+    meta = {
+        "ocr_engine": "tesseract",
+        "ocr_dpi": dpi,
+        "ocr_blocks": len(blocks),
+        "avg_conf": float(np.mean(confs)) if confs else -1.0,
+    }
+    return "\n\n".join(b["text"] for b in blocks), meta
+
+
+def ocr_scanned_pages(path: str, docs: List[Document], lang: str = "eng", tesseract_cmd: Optional[str] = None) -> int:
+    """
+    OCR pages with no usable text layer, in a process pool, and write the text
+    back into those page Documents in place. Returns the number of pages OCR'd.
+    """
+    targets: Dict[int, Document] = {}
+    for i, d in enumerate(docs):
+        if _needs_ocr(d):
+            targets[int(d.metadata.get("page", i))] = d
+    if not targets:
+        return 0
+
+    try:
+        tesseract_cmd = _configure_tesseract(tesseract_cmd)
+    except RuntimeError as e:
+        # no tesseract here: keep the (empty) text layer rather than failing the PDF
+        for d in targets.values():
+            d.metadata["ocr_error"] = str(e).splitlines()[0]
+        return 0
+
+    # Each page holds an "ocr" slot while queued or running in the pool, so
+    # PDF pages and image OCR together stay within LIMIT_OCR.
+    gate = stage_gate("ocr")
+    pool = _get_ocr_pool()
+    futures: Dict[int, Future] = {}
+    try:
+        for page_no in sorted(targets):
+            job = (path, page_no, lang, tesseract_cmd)
+            started = gate.acquire()
+            try:
+                try:
+                    fut = pool.submit(_ocr_page, job)
+                except BrokenProcessPool:
+                    _discard_ocr_pool(pool)
+                    pool = _get_ocr_pool()
+                    fut = pool.submit(_ocr_page, job)
+            except Exception:
+                gate.release(started)
+                raise
+            fut.add_done_callback(lambda _, started=started: gate.release(started))
+            futures[page_no] = fut
+    except BaseException:
+        # the request is failing (e.g. Overloaded) and its temp PDF is about
+        # to be removed: don't leave its queued pages in the shared pool
+        for fut in futures.values():
+            fut.cancel()
+        raise
+
+    # one bad page (render error, tesseract failure, dead worker) only loses that page
+    done = 0
+    for page_no, fut in futures.items():
+        d = targets[page_no]
+        try:
+            text, meta = fut.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _discard_ocr_pool(pool)
+            d.metadata["ocr_error"] = f"{type(e).__name__}: {e}".splitlines()[0]
+            continue
+        d.page_content = text
+        d.metadata.update(meta)
+        d.metadata["ocr"] = True
+        done += 1
+    return done
+
+
+def load_pdf(
+    path: str,
+    strategy: Literal["auto","text","table"]="auto",
+    extract_images: bool=False,
+    ocr_fallback: bool=True,
+) -> List[Document]:
+    with stage("pdf"):
+        if strategy == "text":
+            docs = PyPDFLoader(path).load()
+        elif strategy == "table":
+            docs = PDFPlumberLoader(path, extract_images=False).load()
+        else:
+            docs = PyMuPDFLoader(path, extract_images=extract_images).load()
+    if ocr_fallback:
+        ocr_scanned_pages(path, docs)
     for d in docs:
         d.metadata.setdefault("filetype", "pdf")
     return docs
@@ -0,0 +1,191 @@
+from typing import Iterator, List, Optional
+from langchain_core.documents import Document
+
+import codecs
+import csv
+import io
+import json
+import mmap
+import os
+
+RECORD_EXTS = {"csv", "tsv", "jsonl", "ndjson"}
+
+_DELIMITERS = {"csv": ",", "tsv": "\t"}
+
+_JSON_BLOCK = 1 << 20
+_JSON_WS = " \t\r\n"
+
+
+def _iter_lines(mm: mmap.mmap, encoding: str) -> Iterator[str]:
+    first = True
+    for raw in iter(mm.readline, b""):
+        line = raw.decode(encoding, errors="replace")
+        if first:
+            line = line.lstrip("\ufeff")  # drop a UTF-8 BOM on the header
+            first = False
+        yield line
+
+
+def is_json_array(path: str, encoding: str = "utf-8") -> bool:
+    """True if the file's first non-whitespace character (after a BOM) is '['."""
+    with open(path, "rb") as f:
+        head = f.read(4096).decode(encoding, errors="replace").lstrip("\ufeff" + _JSON_WS)
+    return head.startswith("[")
+
+
+def _iter_json_array(mm: mmap.mmap, encoding: str) -> Iterator[str]:
+    """
+    Elements of a top-level JSON array, one compact JSON string each, decoded
+    from the map a block at a time so only the current element is held.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buf, pos, offset, eof = "", 0, 0, False
+
+    def more() -> None:
+        nonlocal buf, pos, offset, eof
+        block = mm[offset:offset + _JSON_BLOCK]
+        offset += len(block)
+        eof = not block
+        buf, pos = buf[pos:] + text.decode(block, final=eof), 0
+
+    def skip_ws() -> Optional[str]:
+        # next significant character (not consumed), or None at end of input
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _JSON_WS:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                return None
+            more()
+
+    more()
+    buf = buf.lstrip("\ufeff")
+    if skip_ws() != "[":
+        raise ValueError("not a JSON array")
+    pos += 1
+    if skip_ws() == "]":
+        return
+    while True:
+        skip_ws()
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+            truncated = end == len(buf) and not eof  # e.g. a number cut at the block edge
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            truncated = True
+        if truncated:
+            more()
+            continue
+        pos = end
+        yield json.dumps(value, ensure_ascii=False)
+        sep = skip_ws()
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError(f"expected ',' or ']' in JSON array, got {sep!r}")
+        pos += 1
+
+
+class RecordStreamLoader:
+    """
+    Structure-aware loader for delimited (CSV/TSV), line-delimited JSON and
+    top-level JSON array files (one record per element).
+    The file is memory-mapped and read record by record; rows are grouped into
+    Documents of at most `max_chars` so the chunker never cuts a row in half.
+    CSV/TSV groups repeat the header line so every Document stands alone.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fmt: Optional[str] = None,          # "csv" | "tsv" | "jsonl" | "json"; inferred from extension
+        max_rows: int = 50,
+        max_chars: int = 800,
+        encoding: str = "utf-8",
+        metadata: Optional[dict] = None,
+    ):
+        ext = path.lower().rsplit(".", 1)[-1] if "." in path else ""
+        self.path = path
+        self.fmt = fmt or ("jsonl" if ext in {"jsonl", "ndjson"} else ext)
+        self.max_rows = max_rows
+        self.max_chars = max_chars
+        self.encoding = encoding
+        self.metadata = metadata or {}
+
+    def _records(self, mm: mmap.mmap) -> Iterator[tuple[Optional[str], str]]:
+        """Yields (header, record_text); header is None for JSON formats."""
+        if self.fmt == "json":
+            for rec in _iter_json_array(mm, self.encoding):
+                yield None, rec
+            return
+        lines = _iter_lines(mm, self.encoding)
+        if self.fmt == "jsonl":
+            for line in lines:
+                line = line.strip()
+                if line:
+                    yield None, line
+            return
+
+        delimiter = _DELIMITERS.get(self.fmt, ",")
+        reader = csv.reader(lines, delimiter=delimiter)
+        header_row = next(reader, None)
+        if header_row is None:
+            return
+        buf = io.StringIO()
+        # "\n" terminator so embedded newlines still get quoted; stripped below
+        writer = csv.writer(buf, delimiter=delimiter, lineterminator="\n")
+        writer.writerow(header_row)
+        header = buf.getvalue()[:-1]
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            buf.seek(0); buf.truncate()
+            writer.writerow(row)
+            yield header, buf.getvalue()[:-1]
+
+    def _make_doc(self, header: Optional[str], rows: List[str], first_row: int) -> Document:
+        body = "\n".join(rows)
+        content = f"{header}\n{body}" if header else body
+        meta = {
+            "source": self.path,
+            "filetype": self.fmt,
+            "row_start": first_row,
+            "row_end": first_row + len(rows) - 1,
+            **self.metadata,
+        }
+        return Document(page_content=content, metadata=meta)
+
+    def lazy_load(self) -> Iterator[Document]:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"File not found at {self.path}")
+        if os.path.getsize(self.path) == 0:
+            return  # mmap can't map an empty file
+
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            rows: List[str] = []
+            size = 0
+            header: Optional[str] = None
+            first_row = 0
+            row_no = 0
+            for header, rec in self._records(mm):
+                budget = self.max_chars - (len(header) + 1 if header else 0)
+                if rows and (len(rows) >= self.max_rows or size + len(rec) + 1 > budget):
+                    yield self._make_doc(header, rows, first_row)
+                    rows, size, first_row = [], 0, row_no
+                rows.append(rec)
+                size += len(rec) + 1
+                row_no += 1
+            if rows:
+                yield self._make_doc(header, rows, first_row)
+
+    def load(self) -> List[Document]:
+        return list(self.lazy_load())
+
+
+def load_records(path: str, fmt: Optional[str] = None, max_rows: int = 50, max_chars: int = 800) -> List[Document]:
+    """Whole file at once; the ingest pipeline streams lazy_load() instead."""
+    return RecordStreamLoader(path, fmt=fmt, max_rows=max_rows, max_chars=max_chars).load()
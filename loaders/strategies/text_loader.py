@@ -1,6 +1,6 @@
 from typing import List
 from langchain_core.documents import Document
-from langchain_community.document_loaders import TextLoader, UnstructuredFileLoader
+from langchain_community.document_loaders import TextLoader, UnstructuredFileLoader, BSHTMLLoader
 
 TEXT_EXTS = {"txt","md","rst","csv","tsv","json","yaml","yml"}
 DOC_EXTS  = {"docx","pptx","html","htm","eml"}
@@ -16,3 +16,9 @@ def load_doclike_unstructured(path: str) -> List[Document]:
     for d in docs:
         d.metadata.setdefault("filetype", "document")
     return docs
+
+def load_html(path: str, encoding: str | None = None) -> List[Document]:
+    docs = BSHTMLLoader(path, open_encoding=encoding).load()
+    for d in docs:
+        d.metadata.setdefault("filetype", "html")
+    return docs
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from langchain_core.documents import Document
 from langchain_community.document_loaders import WebBaseLoader, SitemapLoader
 
@@ -9,11 +9,36 @@ def load_web_url(urls: List[str]) -> List[Document]:
         d.metadata.setdefault("filetype", "web")
     return docs
 
-def load_sitemap(sitemap_url: str, max_docs: Optional[int]=200) -> List[Document]:
+def iter_sitemap_batches(
+    sitemap_url: str,
+    max_docs: Optional[int] = 200,
+    batch_size: int = 20,
+    skip_batches: int = 0,
+) -> Iterator[List[Document]]:
+    """
+    Same pages as SitemapLoader.load(), fetched `batch_size` at a time so a
+    caller can commit progress between batches. `skip_batches` resumes after
+    batches a previous attempt already committed.
+    """
     loader = SitemapLoader(sitemap_url)
-    docs = loader.load()
+    soup = loader._scrape(sitemap_url, parser="xml")
+    els = [el for el in loader.parse_sitemap(soup) if "loc" in el]
     if max_docs:
-        docs = docs[:max_docs]
-    for d in docs:
-        d.metadata.setdefault("filetype", "web")
+        els = els[:max_docs]  # don't fetch pages we'd throw away
+    for start in range(skip_batches * batch_size, len(els), batch_size):
+        batch = els[start:start + batch_size]
+        results = loader.scrape_all([el["loc"].strip() for el in batch])
+        docs = [
+            Document(page_content=loader.parsing_function(r), metadata=loader.meta_function(el, r))
+            for el, r in zip(batch, results)
+        ]
+        for d in docs:
+            d.metadata.setdefault("filetype", "web")
+        yield docs
+
+def load_sitemap(sitemap_url: str, max_docs: Optional[int]=200) -> List[Document]:
+    docs: List[Document] = []
+    # one batch: let scrape_all fetch everything concurrently
+    for batch in iter_sitemap_batches(sitemap_url, max_docs, batch_size=max_docs or 1_000_000):
+        docs.extend(batch)
     return docs
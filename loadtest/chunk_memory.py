@@ -0,0 +1,83 @@
+"""
+Memory comparison: per-chunk LangChain Documents (the old chunker output)
+versus Chunk views with shared per-source metadata.
+
+    python -m loadtest.chunk_memory --pages 1000 --ocr-blocks 5000
+"""
+import argparse
+import gc
+import tracemalloc
+from typing import Callable, List
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from pipeline.chunker import chunk_documents
+
+WORDS = "vector index chunk embedding namespace session tenant error E1042 SKU-88213 ".split()
+
+
+def make_pdf_like(pages: int) -> List[Document]:
+    body = " ".join(WORDS[i % len(WORDS)] for i in range(900))
+    return [
+        Document(
+            page_content=f"Page {p}\n" + body,
+            metadata={"source": "big.pdf", "file_path": "/tmp/big.pdf", "total_pages": pages,
+                      "filetype": "pdf", "creator": "scanner", "producer": "pdf-lib", "page": p},
+        )
+        for p in range(pages)
+    ]
+
+
+def make_ocr_like(blocks: int) -> List[Document]:
+    base = {"source": "scan.png", "filetype": "image", "tesseract_cmd": "/usr/bin/tesseract",
+            "image_width": 2480, "image_height": 3508, "ocr_engine": "tesseract", "mode": "elements"}
+    return [
+        Document(
+            page_content=" ".join(WORDS[(b + i) % len(WORDS)] for i in range(30)),
+            metadata={**base, "bbox": f"[0.1, {b / blocks:.4f}, 0.9, {(b + 1) / blocks:.4f}]",
+                      "avg_conf": 91.5, "line_count": 2, "block_num": b, "par_num": 1},
+        )
+        for b in range(blocks)
+    ]
+
+
+def legacy_chunks(docs: List[Document], chunk_size: int = 900, chunk_overlap: int = 120) -> List[Document]:
+    # what chunk_documents + run_pipeline produced before: copies at every step
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+    prepped = [Document(page_content=d.page_content.strip(), metadata=dict(d.metadata)) for d in docs]
+    out = []
+    for i, c in enumerate(splitter.split_documents(prepped)):
+        meta = dict(c.metadata)
+        meta["chunk_index"] = i
+        meta.update({"datastore": "permanent", "namespace": "bench"})
+        out.append(Document(page_content=c.page_content, metadata=meta))
+    return out
+
+
+def measure(fn: Callable[[], list]) -> tuple[int, int, int]:
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(result)
+    del result
+    return n, current, peak
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=1000)
+    ap.add_argument("--ocr-blocks", type=int, default=5000)
+    args = ap.parse_args(argv)
+
+    for label, docs in (("pdf", make_pdf_like(args.pages)), ("ocr", make_ocr_like(args.ocr_blocks))):
+        for name, fn in (("documents", lambda: legacy_chunks(docs)), ("chunks", lambda: chunk_documents(docs))):
+            n, current, peak = measure(fn)
+            print(f"{label:<4} {name:<10} chunks={n:<7} retained={current / 1e6:8.2f} MB  peak={peak / 1e6:8.2f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
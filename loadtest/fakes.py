@@ -0,0 +1,105 @@
+"""
+Local stand-ins for the app's external services, each with injectable latency:
+  - an OpenAI-compatible /v1/embeddings server (deterministic hash vectors)
+  - a pass-through proxy in front of a local `chroma run` server
+  - a tiny static site (pages + sitemap.xml) for url/sitemap ingests
+"""
+import asyncio
+import base64
+import hashlib
+import random
+import struct
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import HTMLResponse
+
+EMBED_DIM = 1536
+
+
+class Latency:
+    def __init__(self, base_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.base_ms = base_ms
+        self.jitter_ms = jitter_ms
+
+    async def wait(self) -> None:
+        delay = self.base_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+
+def _fake_vector(item, dim: int = EMBED_DIM) -> list[float]:
+    # input may be a string or a token-id list (OpenAIEmbeddings pre-tokenizes)
+    seed = hashlib.sha256(repr(item).encode("utf-8")).digest()
+    rng = random.Random(seed)
+    vec = [rng.uniform(-1, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+def embedding_app(latency: Latency) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await latency.wait()
+        inputs = body["input"]
+        # a single string or a single token list is one input
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dim = int(body.get("dimensions") or EMBED_DIM)
+        data = []
+        for i, item in enumerate(inputs):
+            vec = _fake_vector(item, dim)
+            if body.get("encoding_format") == "base64":
+                vec = base64.b64encode(struct.pack(f"<{dim}f", *vec)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vec})
+        tokens = sum(len(x) if isinstance(x, list) else len(x.split()) for x in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    return app
+
+
+def latency_proxy_app(upstream: str, latency: Latency) -> FastAPI:
+    app = FastAPI()
+    client = httpx.AsyncClient(base_url=upstream, timeout=60)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def proxy(path: str, request: Request):
+        await latency.wait()
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in {"host", "content-length"}}
+        upstream_resp = await client.request(
+            request.method, f"/{path}", params=request.query_params,
+            content=await request.body(), headers=headers,
+        )
+        excluded = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+        return Response(
+            content=upstream_resp.content,
+            status_code=upstream_resp.status_code,
+            headers={k: v for k, v in upstream_resp.headers.items() if k.lower() not in excluded},
+        )
+
+    return app
+
+
+def static_site_app(base_url: str, pages: int = 20) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/page/{n}", response_class=HTMLResponse)
+    def page(n: int):
+        paras = "".join(f"<p>Page {n} paragraph {i}: error code E{n:03d}-{i} applies to SKU-{n * 100 + i}.</p>" for i in range(12))
+        return f"<html><head><title>Page {n}</title></head><body><h1>Page {n}</h1>{paras}</body></html>"
+
+    @app.get("/sitemap.xml")
+    def sitemap():
+        urls = "".join(f"<url><loc>{base_url}/page/{n}</loc></url>" for n in range(pages))
+        xml = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        return Response(content=xml, media_type="application/xml")
+
+    return app
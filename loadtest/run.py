@@ -0,0 +1,221 @@
+"""
+End-to-end /ingest load test against local stand-ins for OpenAI and Chroma.
+
+    python -m loadtest.run --concurrency 1,4,16 --requests 100 \
+        --embed-latency-ms 80 --chroma-latency-ms 20
+
+Starts: a fake embeddings server, a local `chroma run`, a latency proxy in front
+of it, a static site for url/sitemap jobs and the app itself (uvicorn main:app),
+then replays a mixed workload at each concurrency level and prints
+p50/p95/p99 latency, throughput and error rate per level and per job kind.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import httpx
+import uvicorn
+
+from loadtest.fakes import Latency, embedding_app, latency_proxy_app, static_site_app
+from loadtest.workload import Job, build_fixtures, build_jobs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve_in_thread(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    return server
+
+
+def _wait_http(url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(pct / 100 * (len(s) - 1)))))
+    return s[idx]
+
+
+def _summarize(samples: List[dict], wall_s: float) -> dict:
+    lat = [x["ms"] for x in samples]
+    errors = sum(1 for x in samples if not x["ok"])
+    return {
+        "requests": len(samples),
+        "p50_ms": round(_percentile(lat, 50), 1),
+        "p95_ms": round(_percentile(lat, 95), 1),
+        "p99_ms": round(_percentile(lat, 99), 1),
+        "throughput_rps": round(len(samples) / wall_s, 2) if wall_s else 0.0,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+async def _send(client: httpx.AsyncClient, job: Job) -> dict:
+    t0 = time.perf_counter()
+    try:
+        if job.file_path:
+            with open(job.file_path, "rb") as f:
+                files = {"file": (os.path.basename(job.file_path), f.read())}
+            resp = await client.post("/ingest", data=job.form, files=files)
+        else:
+            resp = await client.post("/ingest", data=job.form)
+        ok = resp.status_code == 200
+        status = resp.status_code
+    except httpx.HTTPError as e:
+        ok, status = False, type(e).__name__
+    return {"kind": job.kind, "ms": (time.perf_counter() - t0) * 1000, "ok": ok, "status": status}
+
+
+async def run_level(app_url: str, jobs: List[Job], concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=app_url, timeout=300) as client:
+        async def one(job: Job) -> dict:
+            async with sem:
+                return await _send(client, job)
+
+        t0 = time.perf_counter()
+        samples = await asyncio.gather(*(one(j) for j in jobs))
+        wall = time.perf_counter() - t0
+
+    by_kind: Dict[str, List[dict]] = {}
+    for s in samples:
+        by_kind.setdefault(s["kind"], []).append(s)
+    return {
+        "concurrency": concurrency,
+        **_summarize(samples, wall),
+        "by_kind": {k: _summarize(v, wall) for k, v in sorted(by_kind.items())},
+        "statuses": sorted({str(s["status"]) for s in samples if not s["ok"]}),
+    }
+
+
+def _seed_tiktoken(cache_dir: str) -> None:
+    """
+    OpenAIEmbeddings tokenizes inputs with tiktoken, which downloads its
+    encoding file on first use. Load it once here into a persistent cache dir
+    that the app then reads, so later runs need no network.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ["TIKTOKEN_CACHE_DIR"] = cache_dir
+    import tiktoken
+    try:
+        tiktoken.get_encoding("cl100k_base")  # encoding of text-embedding-3-*
+    except Exception as e:
+        raise SystemExit(
+            f"tiktoken encoding not cached in {cache_dir} and could not be downloaded ({e}). "
+            "Run once with network access, or copy a seeded cache dir there."
+        )
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    ap.add_argument("--requests", type=int, default=50, help="requests per level")
+    ap.add_argument("--embed-latency-ms", type=float, default=50.0)
+    ap.add_argument("--embed-jitter-ms", type=float, default=10.0)
+    ap.add_argument("--chroma-latency-ms", type=float, default=10.0)
+    ap.add_argument("--chroma-jitter-ms", type=float, default=5.0)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    ap.add_argument("--json", help="write the report to this path as well")
+    ap.add_argument(
+        "--tiktoken-cache",
+        default=os.getenv("TIKTOKEN_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "vectoriq-loadtest", "tiktoken"),
+        help="persistent tiktoken cache; seeded on the first (online) run",
+    )
+    args = ap.parse_args(argv)
+    _seed_tiktoken(args.tiktoken_cache)
+
+    workdir = tempfile.mkdtemp(prefix="vectoriq-loadtest-")
+    procs: List[subprocess.Popen] = []
+    try:
+        embed_port, chroma_port, proxy_port, site_port, app_port = (_free_port() for _ in range(5))
+        site_url = f"http://127.0.0.1:{site_port}"
+
+        _serve_in_thread(embedding_app(Latency(args.embed_latency_ms, args.embed_jitter_ms)), embed_port)
+        _serve_in_thread(static_site_app(site_url), site_port)
+
+        procs.append(subprocess.Popen(
+            ["chroma", "run", "--path", os.path.join(workdir, "chroma"), "--host", "127.0.0.1", "--port", str(chroma_port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        _wait_http(f"http://127.0.0.1:{chroma_port}/api/v2/heartbeat")
+        _serve_in_thread(
+            latency_proxy_app(f"http://127.0.0.1:{chroma_port}", Latency(args.chroma_latency_ms, args.chroma_jitter_ms)),
+            proxy_port,
+        )
+
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "sk-loadtest",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{embed_port}/v1",
+            "CHROMA_HOST": "127.0.0.1",
+            "CHROMA_PORT": str(proxy_port),
+            "INGEST_LEDGER_PATH": os.path.join(workdir, "ledger.sqlite"),
+            "INGEST_CHECKPOINT_DIR": os.path.join(workdir, "checkpoints"),
+            "TIKTOKEN_CACHE_DIR": args.tiktoken_cache,
+        }
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=ROOT, env=env,
+        ))
+        app_url = f"http://127.0.0.1:{app_port}"
+        _wait_http(f"{app_url}/health")
+
+        fixtures = build_fixtures(workdir)
+        report = {
+            "config": vars(args),
+            "levels": [],
+        }
+        for i, level in enumerate(int(c) for c in args.concurrency.split(",")):
+            jobs = build_jobs(args.requests, fixtures, site_url, seed=i)
+            result = asyncio.run(run_level(app_url, jobs, level))
+            report["levels"].append(result)
+            print(
+                f"c={level:<4} n={result['requests']:<5} p50={result['p50_ms']:>8}ms "
+                f"p95={result['p95_ms']:>8}ms p99={result['p99_ms']:>8}ms "
+                f"rps={result['throughput_rps']:>7} err={result['error_rate']:.2%}"
+            )
+            for kind, r in result["by_kind"].items():
+                print(f"    {kind:<8} n={r['requests']:<4} p50={r['p50_ms']:>8}ms p95={r['p95_ms']:>8}ms err={r['error_rate']:.2%}")
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+        return 0
+    finally:
+        for p in procs:
+            p.terminate()
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
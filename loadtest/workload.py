@@ -0,0 +1,69 @@
+"""Synthetic inputs for the mixed /ingest workload."""
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+LOREM = (
+    "VectorIQ ingests documents, splits them into chunks and stores embeddings. "
+    "Error E1042 means the upstream timed out; SKU-88213 ships in blue and grey. "
+)
+
+
+@dataclass
+class Job:
+    kind: str                                  # "pdf" | "image" | "text" | "url" | "sitemap"
+    form: Dict[str, str] = field(default_factory=dict)
+    file_path: Optional[str] = None
+
+
+def make_pdf(path: str, pages: int = 5) -> str:
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {p + 1}\n" + LOREM * 12, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_image(path: str, lines: int = 8) -> str:
+    img = np.full((80 + 40 * lines, 1400, 3), 255, np.uint8)
+    for i in range(lines):
+        cv2.putText(img, f"Line {i}: error E1042 on SKU-88213 batch {i * 7}", (30, 60 + 40 * i),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2, cv2.LINE_AA)
+    cv2.imwrite(path, img)
+    return path
+
+
+def build_fixtures(workdir: str) -> Dict[str, str]:
+    os.makedirs(workdir, exist_ok=True)
+    return {
+        "pdf": make_pdf(os.path.join(workdir, "sample.pdf")),
+        "image": make_image(os.path.join(workdir, "sample.png")),
+    }
+
+
+DEFAULT_MIX = {"pdf": 0.25, "image": 0.15, "text": 0.35, "url": 0.2, "sitemap": 0.05}
+
+
+def build_jobs(n: int, fixtures: Dict[str, str], site_url: str, mix: Dict[str, float] = DEFAULT_MIX, seed: int = 0) -> List[Job]:
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=n)
+    jobs: List[Job] = []
+    for i, kind in enumerate(kinds):
+        # unique session per job so runs don't collide in the temporary collection
+        form = {"store_mode": "temporary", "session_id": f"lt-{seed}-{i}", "force": "true"}
+        if kind in ("pdf", "image"):
+            jobs.append(Job(kind, form, fixtures[kind]))
+        elif kind == "text":
+            jobs.append(Job(kind, {**form, "text": LOREM * rng.randint(5, 60)}))
+        elif kind == "url":
+            jobs.append(Job(kind, {**form, "url": f"{site_url}/page/{rng.randrange(20)}"}))
+        else:
+            jobs.append(Job(kind, {**form, "url": f"{site_url}/sitemap.xml", "sitemap": "true"}))
+    return jobs
@@ -3,6 +3,9 @@ load_dotenv()  # Add this at the very top
 from routes.allroutes import routers as rag_routes
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from lib.chroma_connection import prewarm_permanent_collections
+from pipeline.checkpoint import purge_stale_checkpoints
+import os
 
 
 app = FastAPI(title="VectorIQ Backend", version="0.1.0")
@@ -17,6 +20,18 @@ app.add_middleware(
 )
 app.include_router(rag_routes)
 
+@app.on_event("startup")
+def prewarm_collections():
+    # comma-separated hot tenants, e.g. CHROMA_PREWARM_NAMESPACES=acme,globex
+    hot = [ns.strip() for ns in os.getenv("CHROMA_PREWARM_NAMESPACES", "").split(",") if ns.strip()]
+    if hot:
+        prewarm_permanent_collections(hot)
+
+@app.on_event("startup")
+def purge_checkpoints():
+    # abandoned partial ingests older than INGEST_CHECKPOINT_TTL_SECS
+    purge_stale_checkpoints()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -0,0 +1 @@
+# Admin module
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from lib.chroma_connection import collection_cache_stats
+from utils.concurrency import concurrency_stats
+from loaders.general_loader import loader_timings
+from utils.profiling import is_admin, list_profiles, get_profile, collapsed
+
+
+def _require_admin(x_admin_token: str | None = Header(None)) -> None:
+    if not is_admin(x_admin_token):
+        raise HTTPException(403, "admin token required")
+
+# every /admin endpoint needs X-Admin-Token
+router = APIRouter(prefix="/admin", dependencies=[Depends(_require_admin)])
+
+@router.get("/chroma/collections")
+def chroma_collections():
+    cache = collection_cache_stats()
+    return {
+        "cache": cache,
+        "first_write_ms": cache.pop("first_write_ms"),
+    }
+
+@router.get("/concurrency")
+def concurrency():
+    return concurrency_stats()
+
+@router.get("/loaders")
+def loaders():
+    # "sniff:<strategy>" entries are files that would otherwise have hit "fallback"
+    return loader_timings()
+
+@router.get("/profiles")
+def profiles():
+    return {"profiles": list_profiles()}
+
+@router.get("/profiles/{profile_id}")
+def profile(profile_id: str, format: str = "json"):
+    p = get_profile(profile_id)
+    if p is None:
+        raise HTTPException(404, "profile not found")
+    if format == "collapsed":
+        # feed to flamegraph.pl / speedscope
+        return PlainTextResponse(collapsed(p))
+    return p
@@ -1,20 +1,42 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-import os, tempfile, shutil
+from fastapi import APIRouter, Depends, UploadFile, File, Form, Header, HTTPException
+import os, tempfile, hashlib
 from utils.types import LoadParams, ChunkParams, StoreChoice
 from pipeline.orchestrator import run_pipeline
+from stores.ingest_ledger import get_ingest_ledger, content_fingerprint, ledger_key, source_id
+from utils.profiling import should_profile, run_profiled
+from utils.concurrency import admit, Overloaded
+from pipeline.checkpoint import IngestCheckpoint, should_checkpoint
 from typing import Literal
 
 
 router = APIRouter()
 
-def _save_temp(upload: UploadFile) -> str:
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(429, f"{e.what} is at capacity, retry later", headers={"Retry-After": str(e.retry_after)})
+
+async def _ingest_slot():
+    # Admission runs on the event loop before the sync handler takes a
+    # threadpool thread, so queued or rejected requests don't hold one.
+    # Overloaded raised inside the handler (stage limits) is handled there.
+    try:
+        async with admit():
+            yield
+    except Overloaded as e:
+        raise _overloaded(e)
+
+def _save_temp(upload: UploadFile) -> tuple[str, str]:
+    """Copy the upload to a temp file, hashing it on the way. Returns (path, sha256)."""
     suffix = ""
     if upload.filename and "." in upload.filename: suffix = "." + upload.filename.rsplit(".",1)[-1]
     fd, path = tempfile.mkstemp(suffix=suffix); os.close(fd)
-    with open(path, "wb") as f: shutil.copyfileobj(upload.file, f)
-    return path
+    h = hashlib.sha256()
+    with open(path, "wb") as f:
+        while block := upload.file.read(1 << 20):
+            h.update(block)
+            f.write(block)
+    return path, h.hexdigest()
 
-@router.post("/ingest")
+@router.post("/ingest", dependencies=[Depends(_ingest_slot)])
 def ingest(
     # choose exactly one of these:
     file: UploadFile | None = File(None),
@@ -34,14 +56,26 @@ def ingest(
     store_mode: str = Form("temporary"),          # "temporary" | "permanent"
     session_id: str | None = Form(None),
     namespace: str | None = Form(None),
+
+    # dedup: re-run even if this exact ingest is already in the ledger
+    force: bool = Form(False),
+
+    # resume: a retry with the same key continues from the last committed batch
+    # (the content + params + target hash used for dedup, combined with this if given)
+    ingest_key: str | None = Form(None),
+
+    # profiling (admin only, or sampled via PROFILE_SAMPLE_RATE)
+    x_profile: str | None = Header(None),
+    x_admin_token: str | None = Header(None),
 ):
     provided = [x is not None for x in (file, url, text)]
     if sum(provided) != 1:
         raise HTTPException(400, "Provide exactly one of: file, url, or text")
 
     # build LoadParams
+    file_sha256 = None
     if file:
-        path = _save_temp(file)
+        path, file_sha256 = _save_temp(file)
         lp = LoadParams(source_type="file", path=path, pdf_strategy=pdf_strategy, sitemap=False, source_label=source_label)
     elif url:
         lp = LoadParams(source_type="url", url=url, pdf_strategy=pdf_strategy, sitemap=sitemap, source_label=source_label)
@@ -51,10 +85,51 @@ def ingest(
     cp = ChunkParams(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     sc = StoreChoice(mode=store_mode, session_id=session_id, namespace=namespace, metadata=None)
 
+    ledger = get_ingest_ledger()
+    fingerprint = content_fingerprint(lp, file_sha256)
+    key = ledger_key(fingerprint, lp, cp, sc)
+    checkpoint = None
+
     try:
-        result = run_pipeline(lp, cp, sc)
-        return result.dict()
+        if not force:
+            previous = ledger.get(key)
+            if previous is not None:
+                return {**previous.dict(), "deduplicated": True}
+        if should_checkpoint(lp):
+            # a client-chosen key is scoped to this content + params + target, so a
+            # reused ingest_key never resumes another source's checkpoint
+            ck = hashlib.sha256(f"{ingest_key}\0{key}".encode("utf-8")).hexdigest() if ingest_key else key
+            checkpoint = IngestCheckpoint(ck)
+            if not checkpoint.acquire():
+                checkpoint = None
+                raise HTTPException(409, "An ingest with this key is already running")
+        if should_profile(x_profile, x_admin_token):
+            context = {
+                "source_type": lp.source_type,
+                "filename": file.filename if file else None,
+                "input_bytes": os.path.getsize(lp.path) if file else len(text or ""),
+                "pdf_strategy": pdf_strategy,
+                "chunk_size": chunk_size,
+                "store_mode": store_mode,
+                "resumed": bool(checkpoint and checkpoint.resumed),
+            }
+            result, profile_id = run_profiled(
+                lambda: run_pipeline(lp, cp, sc, checkpoint, source_id(fingerprint)),
+                context=context,
+                describe=lambda r: {"strategy": r.strategy, "total_chunks": r.total_chunks},
+            )
+        else:
+            result, profile_id = run_pipeline(lp, cp, sc, checkpoint, source_id(fingerprint)), None
+        ledger.put(key, fingerprint, result)
+        response = {**result.dict(), "deduplicated": False}
+        if profile_id:
+            response["profile_id"] = profile_id
+        return response
+    except Overloaded as e:
+        raise _overloaded(e)
     finally:
+        if checkpoint:
+            checkpoint.release()
         if file:
             try: os.remove(lp.path)  # cleanup temp file
             except Exception: pass
@@ -0,0 +1,160 @@
+from fastapi import APIRouter, HTTPException
+import time
+from stores.lexical_index import get_lexical_index, fuse_rrf, LexicalIndex
+from utils.concurrency import Overloaded
+from stores.namespace_router import get_namespace_router, ROUTER_N_PROBE, ROUTER_BOOTSTRAP_SAMPLE
+from lib.chroma_connection import list_permanent_namespaces
+
+
+router = APIRouter()
+
+def _ensure_lexical(key: str, namespace: str | None, session_id: str | None) -> None:
+    # build the partition from Chroma once per process (after a restart, on
+    # another worker, or after eviction); ingests keep it current after that
+    from pipeline.orchestrator import _get_temp_store, _get_perm_store
+    if session_id:
+        fetch = lambda: _get_temp_store().iter_documents(session_id)
+    else:
+        fetch = lambda: _get_perm_store().iter_documents("knowledge", namespace)
+    get_lexical_index().ensure(key, fetch)
+
+def _hydrate(hits: list, namespace: str | None, session_id: str | None) -> list:
+    # the index holds ids only; text and metadata for the top-k come from Chroma
+    from pipeline.orchestrator import _get_temp_store, _get_perm_store
+    ids = [h["id"] for h in hits]
+    if session_id:
+        records = _get_temp_store().get_by_ids(ids)
+    else:
+        records = _get_perm_store().get_by_ids(ids, base_collection="knowledge", namespace=namespace)
+    return [
+        {**h, "content": records[h["id"]][0], "metadata": records[h["id"]][1]}
+        for h in hits if h["id"] in records
+    ]
+
+@router.get("/search/lexical")
+def search_lexical(
+    q: str,
+    k: int = 10,
+    namespace: str | None = None,
+    session_id: str | None = None,
+    hybrid: bool = False,           # fuse with vector hits (costs one embedding call)
+):
+    if not q.strip():
+        raise HTTPException(400, "q must not be empty")
+    mode = "temporary" if session_id else "permanent"
+    index = get_lexical_index()
+    key = LexicalIndex.key(mode, namespace, session_id)
+    _ensure_lexical(key, namespace, session_id)
+
+    lex = index.search(key, q, k)
+    t0 = time.perf_counter()
+    lexical = _hydrate(lex["results"], namespace, session_id)
+    fetch_ms = (time.perf_counter() - t0) * 1000
+    if not hybrid:
+        return {
+            "mode": "lexical",
+            "took_ms": lex["took_ms"] + fetch_ms,
+            "lexical_ms": lex["took_ms"],
+            "fetch_ms": fetch_ms,
+            "results": lexical,
+        }
+
+    from pipeline.orchestrator import _get_temp_store, _get_perm_store
+    t0 = time.perf_counter()
+    try:
+        if session_id:
+            vec = _get_temp_store().query(session_id, q, k)
+        else:
+            vec = _get_perm_store().query(q, k, base_collection="knowledge", namespace=namespace)
+    except Overloaded as e:
+        raise HTTPException(429, f"{e.what} is at capacity, retry later", headers={"Retry-After": str(e.retry_after)})
+    vector_ms = (time.perf_counter() - t0) * 1000
+    return {
+        "mode": "hybrid",
+        "took_ms": lex["took_ms"] + fetch_ms + vector_ms,
+        "lexical_ms": lex["took_ms"],
+        "fetch_ms": fetch_ms,
+        "vector_ms": vector_ms,
+        "results": fuse_rrf(lexical, vec, k),
+    }
+
+@router.get("/search/lexical/stats")
+def lexical_stats(namespace: str | None = None, session_id: str | None = None):
+    mode = "temporary" if session_id else "permanent"
+    key = LexicalIndex.key(mode, namespace, session_id)
+    _ensure_lexical(key, namespace, session_id)
+    return get_lexical_index().stats(key)
+
+def _fan_out(store, embedding, namespaces, k: int) -> tuple[list, float]:
+    t0 = time.perf_counter()
+    hits = []
+    for ns in namespaces:
+        for h in store.query_by_embedding(embedding, k, base_collection="knowledge", namespace=ns):
+            hits.append({**h, "namespace": ns})
+    hits.sort(key=lambda h: h["score"], reverse=True)
+    return hits[:k], (time.perf_counter() - t0) * 1000
+
+@router.get("/search/namespaces")
+def search_namespaces(
+    q: str,
+    namespaces: str | None = None,      # comma-separated; default: every namespace in Chroma
+    k: int = 10,
+    n_probe: int = ROUTER_N_PROBE,
+    compare: bool = False,              # also run the full fan-out and report recall
+):
+    if not q.strip():
+        raise HTTPException(400, "q must not be empty")
+    from pipeline.orchestrator import _get_perm_store
+    store = _get_perm_store()
+    ns_router = get_namespace_router()
+
+    # candidates come from Chroma, not the router, which only knows namespaces
+    # written to by this process since it started
+    if namespaces:
+        candidates = [ns.strip() for ns in namespaces.split(",") if ns.strip()]
+    else:
+        candidates = list_permanent_namespaces("knowledge")
+    try:
+        embedding = store.embed_query(q)
+    except Overloaded as e:
+        raise HTTPException(429, f"{e.what} is at capacity, retry later", headers={"Retry-After": str(e.retry_after)})
+
+    # seed sketches for namespaces this process hasn't written to (once each)
+    t0 = time.perf_counter()
+    ns_router.ensure(candidates, lambda ns: store.sample_embeddings("knowledge", ns, ROUTER_BOOTSTRAP_SAMPLE))
+    bootstrap_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    routed = ns_router.route(embedding, n_probe, candidates)
+    route_ms = (time.perf_counter() - t0) * 1000
+    # namespaces with no sketch (no stored vectors, or the sample fetch
+    # failed) can't be ranked, so they're queried rather than silently skipped
+    known = set(ns_router.namespaces())
+    unrouted = [ns for ns in candidates if ns not in known]
+    probed = [ns for ns, _ in routed] + unrouted
+
+    results, query_ms = _fan_out(store, embedding, probed, k)
+    response = {
+        "results": results,
+        "probed": probed,
+        "route_scores": {str(ns): score for ns, score in routed},
+        "candidates": len(candidates),
+        "route_ms": route_ms,
+        "bootstrap_ms": bootstrap_ms,
+        "query_ms": query_ms,
+    }
+    if compare:
+        full, full_ms = _fan_out(store, embedding, candidates, k)
+        full_ids = {h["id"] for h in full}
+        response["comparison"] = {
+            "recall_at_k": len(full_ids & {h["id"] for h in results}) / len(full_ids) if full_ids else 1.0,
+            "full_fan_out_ms": full_ms,
+            "routed_ms": route_ms + query_ms,
+            "collections_full": len(candidates),
+            "collections_routed": len(probed),
+        }
+    return response
+
+@router.get("/search/namespaces/stats")
+def namespace_router_stats():
+    return get_namespace_router().stats()
@@ -0,0 +1,203 @@
+import json
+import os
+import pickle
+import shutil
+import time
+from typing import Any, List, Optional, Tuple
+
+from utils.detect import sniff_file
+from utils.types import LoadParams
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHECKPOINT_DIR = os.getenv("INGEST_CHECKPOINT_DIR", ".ingest_checkpoints")
+CHECKPOINT_TTL_SECS = float(os.getenv("INGEST_CHECKPOINT_TTL_SECS", str(24 * 3600)))
+# Smaller single-shot sources are cheaper to redo than to checkpoint
+CHECKPOINT_MIN_BYTES = int(os.getenv("INGEST_CHECKPOINT_MIN_BYTES", str(5 * 1024 * 1024)))
+WRITE_BATCH_SIZE = int(os.getenv("INGEST_WRITE_BATCH_SIZE", "256"))    # chunks per embed+write
+FETCH_BATCH_SIZE = int(os.getenv("INGEST_FETCH_BATCH_SIZE", "20"))     # sitemap pages per fetch
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def should_checkpoint(load: LoadParams) -> bool:
+    """
+    Checkpoint only ingests that are slow to redo: sitemaps, multi-page PDFs
+    and anything of at least CHECKPOINT_MIN_BYTES.
+    """
+    if load.source_type == "url":
+        return bool(load.sitemap)
+    if load.source_type == "text":
+        return len(load.text or "") >= CHECKPOINT_MIN_BYTES
+    if os.path.getsize(load.path) >= CHECKPOINT_MIN_BYTES:
+        return True
+    if sniff_file(load.path)[0] != "pdf":
+        return False
+    try:
+        import pymupdf
+        with pymupdf.open(load.path) as pdf:
+            return pdf.page_count > 1
+    except Exception:
+        return False
+
+
+class IngestCheckpoint:
+    """
+    Durable progress for one ingest, kept under CHECKPOINT_DIR/<key>/:
+      manifest.json   stage flags and committed batch counters
+      fetch_<n>.pkl   fetched/parsed Documents, one file per fetch batch
+      chunks.pkl      chunker output
+    A retry with the same key resumes after the last committed batch;
+    the directory is removed once the ingest completes. Only the holder of
+    CHECKPOINT_DIR/<key>.lock (see acquire) may use it; the OS drops the
+    lock if the process dies, so a crashed attempt never blocks its retry.
+    """
+
+    def __init__(self, key: str, root: str = CHECKPOINT_DIR):
+        self.key = key
+        self.dir = os.path.join(root, key)  # created on first commit
+        self._manifest_path = os.path.join(self.dir, "manifest.json")
+        self._lock_path = os.path.join(root, f"{key}.lock")
+        self._lock_fd: Optional[int] = None
+        self.manifest = self._read_manifest()
+
+    def acquire(self) -> bool:
+        """Take the per-key lock without blocking. False if another attempt holds it."""
+        os.makedirs(os.path.dirname(self._lock_path), exist_ok=True)
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not _try_lock(fd):
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        # the previous holder may have committed more since __init__
+        self.manifest = self._read_manifest()
+        return True
+
+    def release(self) -> None:
+        # the lock file stays; unlinking it would let two openers lock different inodes
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"loaded": False, "strategy": None, "fetch_batches": 0, "chunked": False, "written_batches": 0}
+
+    def _commit(self, **changes: Any) -> None:
+        self.manifest.update(changes, updated_at=time.time())
+        _atomic_write(self._manifest_path, json.dumps(self.manifest).encode("utf-8"))
+
+    def _dump(self, name: str, obj: Any) -> None:
+        _atomic_write(os.path.join(self.dir, name), pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _load(self, name: str) -> Any:
+        with open(os.path.join(self.dir, name), "rb") as f:
+            return pickle.load(f)
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.manifest["fetch_batches"] or self.manifest["loaded"] or self.manifest["written_batches"])
+
+    # --- fetch/load stage -------------------------------------------------
+    @property
+    def fetch_batches(self) -> int:
+        return self.manifest["fetch_batches"]
+
+    def commit_fetch_batch(self, docs: list) -> None:
+        n = self.manifest["fetch_batches"]
+        self._dump(f"fetch_{n}.pkl", docs)
+        self._commit(fetch_batches=n + 1)
+
+    def fetched_docs(self) -> list:
+        docs: list = []
+        for n in range(self.manifest["fetch_batches"]):
+            docs.extend(self._load(f"fetch_{n}.pkl"))
+        return docs
+
+    def loaded(self) -> Optional[Tuple[list, str]]:
+        if not self.manifest["loaded"]:
+            return None
+        return self.fetched_docs(), self.manifest["strategy"]
+
+    def commit_loaded(self, docs: list, strategy: str) -> None:
+        # batched loaders have committed their pages already
+        if self.manifest["fetch_batches"] == 0:
+            self.commit_fetch_batch(docs)
+        self._commit(loaded=True, strategy=strategy)
+
+    # --- chunk stage ------------------------------------------------------
+    def chunks(self) -> Optional[list]:
+        return self._load("chunks.pkl") if self.manifest["chunked"] else None
+
+    def commit_chunks(self, chunks: list) -> None:
+        self._dump("chunks.pkl", chunks)
+        self._commit(chunked=True)
+
+    # --- write stage ------------------------------------------------------
+    @property
+    def written_batches(self) -> int:
+        return self.manifest["written_batches"]
+
+    def commit_written_batch(self, batch: int) -> None:
+        self._commit(written_batches=batch + 1)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def purge_stale_checkpoints(root: str = CHECKPOINT_DIR, ttl_secs: float = CHECKPOINT_TTL_SECS) -> int:
+    """
+    Remove checkpoint dirs untouched for ttl_secs. Safe to run from every
+    worker at once: entries another worker already removed are skipped, and
+    a dir is only removed while holding its key's lock. Lock files are never
+    unlinked (see IngestCheckpoint.release).
+    """
+    if not ttl_secs or not os.path.isdir(root):
+        return 0
+    removed = 0
+    cutoff = time.time() - ttl_secs
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if not os.path.isdir(path) or os.path.getmtime(path) >= cutoff:
+                continue
+            fd = os.open(os.path.join(root, f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        except FileNotFoundError:
+            continue  # removed by another worker meanwhile
+        try:
+            if _try_lock(fd):  # held means an ingest is still using it
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        finally:
+            os.close(fd)
+    return removed
+
+
+def batches(items: List[Any], size: int = WRITE_BATCH_SIZE) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+_MISSING = object()
+
+
+class Chunk:
+    """
+    Compact chunk: a (start, end) view into its parent text plus metadata split
+    into a `shared` dict (one object per source, referenced by every chunk of it)
+    and a small per-chunk `local` dict. Full metadata dicts and text copies are
+    only built at the store boundary via `text` / `metadata()`.
+    """
+    __slots__ = ("parent", "start", "end", "shared", "local")
+
+    def __init__(self, parent: str, start: int, end: int, shared: Dict[str, Any], local: Dict[str, Any]):
+        self.parent = parent
+        self.start = start
+        self.end = end
+        self.shared = shared
+        self.local = local
+
+    @property
+    def text(self) -> str:
+        return self.parent[self.start:self.end]
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def get(self, key: str, default: Any = None) -> Any:
+        v = self.local.get(key, _MISSING)
+        if v is _MISSING:
+            v = self.shared.get(key, default)
+        return v
+
+    def metadata(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Flattened metadata in Chroma's shape (per-chunk keys win over shared ones)."""
+        return {**self.shared, **self.local, **(extra or {})}
+
+    def to_document(self, extra: Optional[Dict[str, Any]] = None) -> Document:
+        return Document(page_content=self.text, metadata=self.metadata(extra))
+
+
+def split_shared_metadata(metas: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Group metadata dicts by "source" and factor out the key/value pairs every
+    member of a group agrees on (e.g. an OCR image's source, tesseract_cmd and
+    size) into one shared dict. Returns (shared, local) per input, in order.
+    """
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for m in metas:
+        src = m.get("source")
+        common = groups.get(src)
+        if common is None:
+            groups[src] = dict(m)
+        else:
+            for k in [k for k, v in common.items() if m.get(k, _MISSING) != v]:
+                del common[k]
+
+    out = []
+    for m in metas:
+        shared = groups[m.get("source")]
+        out.append((shared, {k: v for k, v in m.items() if k not in shared}))
+    return out
@@ -1,7 +1,9 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from pipeline.chunk import Chunk, split_shared_metadata
+
 
 def chunk_documents(
     docs: List[Document],
@@ -9,18 +11,19 @@ def chunk_documents(
     chunk_overlap: int = 120,
     min_chunk_chars: int = 1,          # set >1 to drop tiny chunks
     strip_whitespace: bool = True,
-) -> List[Document]:
+    counters: Optional[Dict[str, int]] = None,  # pass the same dict to continue chunk_index across calls
+) -> List[Chunk]:
     if not docs:
         return []
 
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        add_start_index=True,          # ensures 'metadata["start_index"]' on chunks
     )
 
     # Clean/prep input docs (avoid None content)
-    prepped: List[Document] = []
+    texts: List[str] = []
+    metas: List[dict] = []
     for d in docs:
         text = d.page_content or ""
         if strip_whitespace:
@@ -28,26 +31,38 @@ def chunk_documents(
             text = text.replace("\r\n", "\n").strip()
         if not text:
             continue
-        prepped.append(Document(page_content=text, metadata=dict(d.metadata or {})))
+        texts.append(text)
+        metas.append(d.metadata or {})
 
-    # Let LangChain do the heavy lifting
-    chunks: List[Document] = splitter.split_documents(prepped)
+    # One shared metadata dict per source instead of a copy per chunk
+    split_metas = split_shared_metadata(metas)
 
     # Add a stable chunk_index per original doc (based on source + optional page)
-    out: List[Document] = []
-    counters: dict[Optional[str], int] = {}
-    for c in chunks:
-        meta = dict(c.metadata or {})
-        # Build a per-document key; tweak fields to your schema
+    out: List[Chunk] = []
+    if counters is None:
+        counters = {}
+    for text, (shared, local) in zip(texts, split_metas):
+        meta = {**shared, **local}  # per-doc view for the key only, not stored
         key = f'{meta.get("source")}:::{meta.get("page", meta.get("page_number"))}'
-        counters[key] = counters.get(key, 0) + 1
-        idx = counters[key] - 1
 
-        if len(c.page_content) < min_chunk_chars:
-            continue
+        # Same offset search as LangChain's add_start_index, but we keep the
+        # offsets as the chunk itself rather than copying the substring.
+        index, prev_len = 0, 0
+        for piece in splitter.split_text(text):
+            found = text.find(piece, max(0, index + prev_len - chunk_overlap))
+            index, prev_len = found, len(piece)
+
+            counters[key] = counters.get(key, 0) + 1
+            idx = counters[key] - 1
+
+            if len(piece) < min_chunk_chars:
+                continue
 
-        meta["chunk_index"] = idx
-        # 'start_index' is already present if add_start_index=True
-        out.append(Document(page_content=c.page_content, metadata=meta))
+            if found < 0:
+                # splitter rewrote the text; fall back to an owned copy
+                parent, start = piece, 0
+            else:
+                parent, start = text, found
+            out.append(Chunk(parent, start, start + len(piece), shared, {**local, "chunk_index": idx, "start_index": found}))
 
     return out
@@ -1,7 +1,12 @@
+import hashlib
+from itertools import islice
 from loaders.general_loader import load_to_documents
 from pipeline.chunker import chunk_documents
 from stores.temp_store import SessionStore
 from stores.permanent_store import PermanentVectorStore
+from stores.lexical_index import get_lexical_index, LexicalIndex
+from pipeline.checkpoint import IngestCheckpoint, batches, WRITE_BATCH_SIZE, FETCH_BATCH_SIZE
+from stores.ingest_ledger import content_fingerprint, source_id as make_source_id
 from utils.types import LoadParams, ChunkParams, StoreChoice, PipelineResult
 
 _temp_store = None
@@ -19,40 +24,134 @@ def _get_perm_store():
         _perm_store = PermanentVectorStore()
     return _perm_store
 
-def run_pipeline(load: LoadParams, chunk: ChunkParams, store: StoreChoice) -> PipelineResult:
-    # 1) Load → Documents (once)
-    docs, strategy = load_to_documents(
-        source_type=load.source_type,
-        path=load.path,
-        filename=(load.path.split("/")[-1] if load.path else None),
-        url=load.url,
-        text=load.text,
-        pdf_strategy=load.pdf_strategy,
-        sitemap=load.sitemap,
-        source_label=load.source_label,
-    )
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            h.update(block)
+    return h.hexdigest()
 
-    # 2) Chunk (Document -> Document)
-    chunks = chunk_documents(docs, chunk_size=chunk.chunk_size, chunk_overlap=chunk.chunk_overlap)
+def run_pipeline(
+    load: LoadParams,
+    chunk: ChunkParams,
+    store: StoreChoice,
+    checkpoint: IngestCheckpoint | None = None,
+    source_id: str | None = None,
+) -> PipelineResult:
+    # chunk ids and the source_id metadata derive from the source, so a re-ingest replaces its records
+    if source_id is None:
+        source_id = make_source_id(content_fingerprint(load, _file_sha256(load.path) if load.source_type == "file" else None))
 
-    # 3) Store
+    # Store target: session or namespace metadata, merged into each record only at the store write
     if store.mode == "temporary":
         assert store.session_id, "session_id required for temporary mode"
-        # attach session metadata
-        for c in chunks:
-            c.metadata.update({"datastore": "temporary", "session_id": store.session_id})
-        _get_temp_store().put(store.session_id, chunks)
+        extra = {"datastore": "temporary", "session_id": store.session_id, "source_id": source_id}
+        write = lambda batch, start: _get_temp_store().put(store.session_id, batch, source_id, extra=extra, start=start)
+        delete_source = lambda: _get_temp_store().delete_source(store.session_id, source_id)
+        make_ids = lambda n, start: SessionStore.make_ids(n, store.session_id, source_id, start)
+    else:
+        # namespace/user/org metadata
+        extra = {"datastore": "permanent", "namespace": store.namespace, "source_id": source_id}
+        write = lambda batch, start: _get_perm_store().upsert(
+            batch, source_id, base_collection="knowledge", namespace=store.namespace, extra=extra, start=start
+        )
+        delete_source = lambda: _get_perm_store().delete_source(source_id, base_collection="knowledge", namespace=store.namespace)
+        make_ids = lambda n, start: PermanentVectorStore.make_ids(n, source_id, start)
+    lexical_key = LexicalIndex.key(store.mode, store.namespace, store.session_id)
+
+    # An earlier ingest of this source (other chunk params or strategy, or a
+    # longer page) may have left records past the new run's last id. Drop
+    # them right before the first write; a resumed run did this already.
+    stale_dropped = bool(checkpoint and checkpoint.written_batches)
+
+    def drop_stale() -> None:
+        nonlocal stale_dropped
+        if not stale_dropped:
+            get_lexical_index().remove(lexical_key, delete_source())
+            stale_dropped = True
+
+    def write_batch(batch, start: int) -> None:
+        drop_stale()
+        write(batch, start)
+        # keep the keyword index in step with what was just written
+        get_lexical_index().add(lexical_key, make_ids(len(batch), start), [c.text for c in batch])
+
+    # 1) Load → Documents (once; or restored from a previous attempt)
+    restored = checkpoint.loaded() if checkpoint else None
+    if restored:
+        docs, strategy = restored
     else:
-        # attach namespace/user/org metadata
-        for c in chunks:
-            c.metadata.update({"datastore": "permanent", "namespace": store.namespace})
-        collection = _get_perm_store().upsert(chunks, base_collection="knowledge", namespace=store.namespace)
+        docs, strategy = load_to_documents(
+            source_type=load.source_type,
+            path=load.path,
+            filename=(load.path.split("/")[-1] if load.path else None),
+            url=load.url,
+            text=load.text,
+            pdf_strategy=load.pdf_strategy,
+            sitemap=load.sitemap,
+            source_label=load.source_label,
+            checkpoint=checkpoint,
+            fetch_batch_size=FETCH_BATCH_SIZE,
+            # record Documents already fit a chunk, so the splitter leaves rows whole
+            max_record_chars=chunk.chunk_size,
+        )
+        if not isinstance(docs, list):
+            return _run_streamed(docs, strategy, chunk, extra, write_batch, drop_stale, checkpoint)
+        if checkpoint:
+            checkpoint.commit_loaded(docs, strategy)
+
+    # 2) Chunk (Document -> Chunk views over the loaded text)
+    chunks = checkpoint.chunks() if checkpoint else None
+    if chunks is None:
+        chunks = chunk_documents(docs, chunk_size=chunk.chunk_size, chunk_overlap=chunk.chunk_overlap)
+        if checkpoint:
+            checkpoint.commit_chunks(chunks)
+
+    # 3) Store, batch by batch; a retry skips batches already written
+    done = checkpoint.written_batches if checkpoint else 0
+    for i, batch in enumerate(batches(chunks, WRITE_BATCH_SIZE)):
+        if i < done:
+            continue
+        write_batch(batch, i * WRITE_BATCH_SIZE)
+        if checkpoint:
+            checkpoint.commit_written_batch(i)
+    drop_stale()  # nothing written (empty source): still clear the old records
 
     # response sample (no large payloads)
-    sample = [{"content": c.page_content[:800], "metadata": c.metadata} for c in chunks[:5]]
+    sample = [{"content": c.text[:800], "metadata": c.metadata(extra)} for c in chunks[:5]]
+
+    if checkpoint:
+        checkpoint.clear()
 
     return PipelineResult(
         total_chunks=len(chunks),
         strategy=strategy,
         sample=sample,
     )
+
+def _run_streamed(docs, strategy, chunk: ChunkParams, extra: dict, write_batch, drop_stale, checkpoint) -> PipelineResult:
+    """
+    Load → chunk → write one window of WRITE_BATCH_SIZE Documents at a time
+    (record files), so memory stays bounded by the window, not the file.
+    A retry re-reads and re-chunks the windows already written, to keep ids
+    and chunk_index stable, but skips their embedding and write.
+    """
+    done = checkpoint.written_batches if checkpoint else 0
+    counters: dict = {}
+    total = 0
+    sample = []
+    for i, window in enumerate(iter(lambda: list(islice(docs, WRITE_BATCH_SIZE)), [])):
+        chunks = chunk_documents(window, chunk_size=chunk.chunk_size, chunk_overlap=chunk.chunk_overlap, counters=counters)
+        if i >= done:
+            write_batch(chunks, total)
+            if checkpoint:
+                checkpoint.commit_written_batch(i)
+        total += len(chunks)
+        if len(sample) < 5:
+            sample += [{"content": c.text[:800], "metadata": c.metadata(extra)} for c in chunks[:5 - len(sample)]]
+    drop_stale()  # nothing written (empty source): still clear the old records
+
+    if checkpoint:
+        checkpoint.clear()
+
+    return PipelineResult(total_chunks=total, strategy=strategy, sample=sample)
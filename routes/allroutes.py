@@ -1,9 +1,13 @@
 from fastapi import APIRouter
 from modules.data_loader.data_loader_service import router as data_loader_router
+from modules.search.search_service import router as search_router
+from modules.admin.admin_service import router as admin_router
 
 routers = APIRouter()
 
 # include the data_loader router under a clear prefix
 routers.include_router(data_loader_router)
+routers.include_router(search_router)
+routers.include_router(admin_router)
 
 
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from utils.types import LoadParams, ChunkParams, StoreChoice, PipelineResult
+
+LEDGER_PATH = os.getenv("INGEST_LEDGER_PATH", ".ingest_ledger.sqlite")
+LEDGER_RETENTION_SECS = float(os.getenv("INGEST_LEDGER_RETENTION_SECS", str(7 * 24 * 3600)))
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))  # fragment never reaches the server
+
+
+def content_fingerprint(load: LoadParams, file_sha256: Optional[str] = None) -> str:
+    if load.source_type == "file":
+        assert file_sha256, "file_sha256 required for file sources"
+        return f"sha256:{file_sha256}"
+    if load.source_type == "url":
+        return f"url:{normalize_url(load.url or '')}"
+    return "sha256:" + hashlib.sha256((load.text or "").encode("utf-8")).hexdigest()
+
+
+def source_id(fingerprint: str) -> str:
+    """Short stable id for one source; chunk ids are derived from it so a re-ingest overwrites in place."""
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+
+def ledger_key(fingerprint: str, load: LoadParams, chunk: ChunkParams, store: StoreChoice) -> str:
+    # json keeps namespace None (collection "knowledge") apart from "default" ("knowledge_default")
+    target = f"session:{json.dumps(store.session_id)}" if store.mode == "temporary" else f"namespace:{json.dumps(store.namespace)}"
+    params = {
+        "content": fingerprint,
+        "loader": {
+            "pdf_strategy": load.pdf_strategy,
+            "sitemap": load.sitemap,
+            "source_label": load.source_label,
+            # extension picks the loader for files
+            "ext": os.path.splitext(load.path)[1].lower() if load.path else None,
+        },
+        "chunk": chunk.model_dump(),
+        "target": target,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class IngestLedger:
+    """
+    Records the PipelineResult of each completed ingest so a repeat of the
+    same content + params + target can be answered without re-running
+    load/OCR/chunk/embed. Backed by a local SQLite file.
+    """
+
+    def __init__(self, path: str = LEDGER_PATH, retention_secs: float = LEDGER_RETENTION_SECS):
+        self.retention_secs = retention_secs
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_ledger ("
+            " key TEXT PRIMARY KEY, fingerprint TEXT, result TEXT, created_at REAL)"
+        )
+        self._conn.commit()
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[PipelineResult]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM ingest_ledger WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        result, created_at = row
+        if self.retention_secs and time.time() - created_at > self.retention_secs:
+            return None
+        return PipelineResult.model_validate_json(result)
+
+    def put(self, key: str, fingerprint: str, result: PipelineResult) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingest_ledger (key, fingerprint, result, created_at) VALUES (?, ?, ?, ?)",
+                (key, fingerprint, result.model_dump_json(), time.time()),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        if not self.retention_secs:
+            return 0
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM ingest_ledger WHERE created_at < ?", (time.time() - self.retention_secs,)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+
+_ledger: IngestLedger | None = None
+
+def get_ingest_ledger() -> IngestLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = IngestLedger()
+    return _ledger
@@ -0,0 +1,321 @@
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Partitions kept in memory (LRU); an evicted one is rebuilt from Chroma on next search
+LEXICAL_MAX_PARTITIONS = int(os.getenv("LEXICAL_MAX_PARTITIONS", "256"))
+# Session partitions idle this long are dropped (0 = LRU eviction only)
+LEXICAL_SESSION_TTL_SECS = float(os.getenv("LEXICAL_SESSION_TTL_SECS", "3600"))
+# Compact a partition once this fraction of its ordinals are tombstones
+LEXICAL_COMPACT_DEAD_FRACTION = float(os.getenv("LEXICAL_COMPACT_DEAD_FRACTION", "0.3"))
+LEXICAL_COMPACT_MIN_DOCS = 64
+
+# Keep identifiers such as "ERR-404", "sku_1234" or "v1.2.3" as single tokens
+# instead of splitting them on punctuation like a prose tokenizer would.
+TOKEN_RE = re.compile(r"\w(?:[\w\-\.]*\w)?")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class _Postings:
+    """
+    Compact posting list for one term: parallel typed arrays of
+    (doc ordinal, term frequency) instead of per-entry Python objects.
+    """
+    __slots__ = ("docs", "tfs")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.tfs = array("I")
+
+    def append(self, doc: int, tf: int) -> None:
+        self.docs.append(doc)
+        self.tfs.append(tf)
+
+
+class _Partition:
+    """
+    One inverted index (a single namespace or session): postings, lengths
+    and ids only; chunk text and metadata stay in Chroma.
+    Documents are appended incrementally; replaced or removed ids are
+    tombstoned and their postings skipped at query time, so writes never
+    rewrite lists. compact() drops the tombstones once they pile up.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, _Postings] = {}
+        self.df: Dict[str, int] = {}
+        self.ids: List[str] = []            # ordinal -> chunk id
+        self.lengths = array("I")           # ordinal -> token count
+        self.terms: List[Tuple[str, ...]] = []  # ordinal -> distinct terms (for df rollback)
+        self.ordinal: Dict[str, int] = {}   # live chunk id -> ordinal
+        self.dead: set[int] = set()
+        self.total_len = 0
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.ordinal)
+
+    def _drop(self, ordinal: int) -> None:
+        # df counts live docs only; undo the dropped doc's contribution
+        self.dead.add(ordinal)
+        self.total_len -= self.lengths[ordinal]
+        for term in self.terms[ordinal]:
+            self.df[term] -= 1
+        self.terms[ordinal] = ()
+
+    def add(self, chunk_id: str, text: str) -> None:
+        tokens = tokenize(text)
+        prev = self.ordinal.get(chunk_id)
+        if prev is not None:
+            self._drop(prev)
+
+        tf: Dict[str, int] = {}
+        for t in tokens:
+            tf[t] = tf.get(t, 0) + 1
+
+        ordinal = len(self.ids)
+        self.ids.append(chunk_id)
+        self.lengths.append(len(tokens))
+        self.terms.append(tuple(sys.intern(t) for t in tf))  # one string per term, not per doc
+        self.ordinal[chunk_id] = ordinal
+        self.total_len += len(tokens)
+
+        for term, freq in tf.items():
+            pl = self.postings.get(term)
+            if pl is None:
+                pl = self.postings[term] = _Postings()
+            pl.append(ordinal, freq)
+            self.df[term] = self.df.get(term, 0) + 1
+
+    def remove(self, chunk_id: str) -> None:
+        prev = self.ordinal.pop(chunk_id, None)
+        if prev is not None:
+            self._drop(prev)
+
+    def needs_compaction(self) -> bool:
+        return len(self.ids) >= LEXICAL_COMPACT_MIN_DOCS and len(self.dead) > LEXICAL_COMPACT_DEAD_FRACTION * len(self.ids)
+
+    def compact(self) -> None:
+        # renumber live ordinals and filter the postings; needs no chunk text
+        remap: Dict[int, int] = {}
+        ids: List[str] = []
+        lengths = array("I")
+        terms: List[Tuple[str, ...]] = []
+        for old, cid in enumerate(self.ids):
+            if old in self.dead:
+                continue
+            remap[old] = len(ids)
+            ids.append(cid)
+            lengths.append(self.lengths[old])
+            terms.append(self.terms[old])
+        postings: Dict[str, _Postings] = {}
+        for term, pl in self.postings.items():
+            kept = _Postings()
+            for doc, tf in zip(pl.docs, pl.tfs):
+                new = remap.get(doc)
+                if new is not None:
+                    kept.append(new, tf)
+            if kept.docs:
+                postings[term] = kept
+        self.postings = postings
+        self.df = {term: n for term, n in self.df.items() if n > 0}
+        self.ids, self.lengths, self.terms = ids, lengths, terms
+        self.ordinal = {cid: i for i, cid in enumerate(ids)}
+        self.dead = set()
+
+    def search(self, terms: List[str], k: int, k1: float, b: float) -> List[Tuple[str, float]]:
+        n = self.n_docs
+        if n == 0 or not terms:
+            return []
+        avgdl = self.total_len / n if n else 0.0
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            pl = self.postings.get(term)
+            df = self.df.get(term, 0)
+            if pl is None or df <= 0:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for doc, tf in zip(pl.docs, pl.tfs):
+                if doc in self.dead:
+                    continue
+                dl = self.lengths[doc]
+                norm = tf + k1 * (1 - b + b * (dl / avgdl if avgdl else 0.0))
+                scores[doc] = scores.get(doc, 0.0) + idf * (tf * (k1 + 1)) / norm
+        top = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+        return [(self.ids[doc], score) for doc, score in top]
+
+
+class _Entry:
+    """A partition plus its per-key locks and build state."""
+    __slots__ = ("part", "lock", "build_lock", "built", "pending", "used_at")
+
+    def __init__(self):
+        self.part = _Partition()
+        self.lock = threading.Lock()        # search / add / compaction of this key
+        self.build_lock = threading.Lock()  # one build from Chroma at a time
+        self.built = False
+        # writes that land while a build is fetching: (id, text), text None = removed
+        self.pending: Optional[List[Tuple[str, Optional[str]]]] = None
+        self.used_at = time.monotonic()
+
+
+class LexicalIndex:
+    """
+    In-process BM25 keyword index, one partition per namespace (permanent)
+    or session (temporary). Fed from the same chunk stream `run_pipeline`
+    writes to Chroma, so exact-token queries (ids, error codes, SKUs) need
+    no embedding round trip. Only postings and ids are held here; callers
+    fetch text for the top hits from Chroma. `ensure` builds a partition
+    once from the records already in Chroma (after a restart, on another
+    worker, or after eviction); from then on `add`/`remove` keep it current.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_partitions: int = LEXICAL_MAX_PARTITIONS,
+        session_ttl_secs: float = LEXICAL_SESSION_TTL_SECS,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.max_partitions = max_partitions
+        self.session_ttl_secs = session_ttl_secs
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()  # guards _entries only
+
+    @staticmethod
+    def key(mode: str, namespace: Optional[str] = None, session_id: Optional[str] = None) -> str:
+        # json keeps namespace None (collection "knowledge") apart from "default" ("knowledge_default")
+        if mode == "temporary":
+            return f"session:{json.dumps(session_id)}"
+        return f"namespace:{json.dumps(namespace)}"
+
+    def _entry(self, key: str) -> _Entry:
+        now = time.monotonic()
+        with self._lock:
+            if self.session_ttl_secs:
+                idle = [
+                    k for k, e in self._entries.items()
+                    if k.startswith("session:") and now - e.used_at > self.session_ttl_secs
+                ]
+                for k in idle:
+                    del self._entries[k]
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            self._entries.move_to_end(key)
+            entry.used_at = now
+            while len(self._entries) > self.max_partitions:
+                self._entries.popitem(last=False)
+            return entry
+
+    def add(self, key: str, ids: List[str], texts: List[str]) -> None:
+        entry = self._entry(key)
+        with entry.lock:
+            for cid, text in zip(ids, texts):
+                entry.part.add(cid, text)
+                if entry.pending is not None:
+                    entry.pending.append((cid, text))
+            if entry.part.needs_compaction():
+                entry.part.compact()
+
+    def remove(self, key: str, ids: Iterable[str]) -> None:
+        entry = self._entry(key)
+        with entry.lock:
+            for cid in ids:
+                entry.part.remove(cid)
+                if entry.pending is not None:
+                    entry.pending.append((cid, None))
+
+    def ensure(self, key: str, fetch: Callable[[], Iterable[Tuple[str, str]]]) -> None:
+        """
+        Build the partition for `key` from `fetch()` ((id, text) for every
+        record in Chroma) unless it was already built. Searches of this key
+        wait for that first build; adds made meanwhile are replayed on top.
+        """
+        entry = self._entry(key)
+        if entry.built:
+            return
+        with entry.build_lock:
+            if entry.built:
+                return
+            with entry.lock:
+                entry.pending = []
+            fresh = _Partition()
+            try:
+                for cid, text in fetch():
+                    fresh.add(cid, text or "")
+            except Exception:
+                with entry.lock:
+                    entry.pending = None
+                return  # Chroma unavailable: keep serving what this process has
+            with entry.lock:
+                for cid, text in entry.pending:
+                    if text is None:
+                        fresh.remove(cid)
+                    else:
+                        fresh.add(cid, text)
+                entry.pending = None
+                if fresh.needs_compaction():
+                    fresh.compact()
+                entry.part = fresh
+                entry.built = True
+
+    def search(self, key: str, query: str, k: int = 10) -> dict:
+        """Top-k (id, BM25 score) hits; the caller fetches their text from Chroma."""
+        t0 = time.perf_counter()
+        entry = self._entry(key)
+        with entry.lock:
+            hits = entry.part.search(tokenize(query), k, self.k1, self.b)
+        return {
+            "results": [{"id": cid, "score": score} for cid, score in hits],
+            "took_ms": (time.perf_counter() - t0) * 1000,
+        }
+
+    def stats(self, key: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {"docs": 0, "terms": 0, "dead": 0, "built": False}
+        with entry.lock:
+            part = entry.part
+            return {"docs": part.n_docs, "terms": len(part.postings), "dead": len(part.dead), "built": entry.built}
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def fuse_rrf(lexical: List[dict], vector: List[dict], k: int = 10, rrf_k: int = 60) -> List[dict]:
+    """
+    Reciprocal-rank fusion of lexical and vector hit lists (each ordered best
+    first, items carrying an "id"). Rank-based, so BM25 and cosine scores
+    need no common scale.
+    """
+    fused: Dict[str, dict] = {}
+    for source, hits in (("lexical", lexical), ("vector", vector)):
+        for rank, h in enumerate(hits):
+            entry = fused.setdefault(h["id"], {**h, "score": 0.0, "sources": []})
+            entry["score"] += 1.0 / (rrf_k + rank + 1)
+            entry["sources"].append(source)
+    return sorted(fused.values(), key=lambda h: h["score"], reverse=True)[:k]
+
+
+_index: LexicalIndex | None = None
+
+def get_lexical_index() -> LexicalIndex:
+    global _index
+    if _index is None:
+        _index = LexicalIndex()
+    return _index
@@ -0,0 +1,137 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+ROUTER_CENTROIDS = int(os.getenv("ROUTER_CENTROIDS", "8"))    # k per namespace
+ROUTER_N_PROBE = int(os.getenv("ROUTER_N_PROBE", "3"))        # namespaces queried per search
+ROUTER_BOOTSTRAP_SAMPLE = int(os.getenv("ROUTER_BOOTSTRAP_SAMPLE", "256"))  # stored vectors read per namespace
+ROUTER_BOOTSTRAP_WORKERS = 8
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norms == 0, 1.0, norms)
+
+
+class _Sketch:
+    """
+    Sequential (online) k-means over one namespace's embeddings: the first k
+    vectors seed the centroids, each later vector moves its nearest centroid
+    by 1/count. O(k·d) memory whatever the namespace size.
+    """
+    __slots__ = ("centroids", "counts", "k")
+
+    def __init__(self, dim: int, k: int):
+        self.k = k
+        self.centroids = np.empty((0, dim), dtype=np.float32)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def update(self, vectors: np.ndarray) -> None:
+        for v in vectors:
+            if len(self.counts) < self.k:
+                self.centroids = np.vstack([self.centroids, v])
+                self.counts = np.append(self.counts, 1)
+                continue
+            j = int(np.argmax(self.centroids @ v))
+            self.counts[j] += 1
+            self.centroids[j] += (v - self.centroids[j]) / self.counts[j]
+
+    def score(self, q: np.ndarray) -> float:
+        # best cosine between the query and any centroid
+        return float(np.max(_normalize(self.centroids) @ q)) if len(self.counts) else -1.0
+
+
+class NamespaceRouter:
+    """
+    Routing index for cross-namespace search. Keeps a small centroid sketch per
+    namespace, fed by PermanentVectorStore.upsert, and picks the `n_probe`
+    namespaces whose centroids sit closest to a query embedding so only those
+    collections are queried. In-process: `ensure` seeds each namespace's
+    sketch once from a sample of its stored embeddings (after a restart or
+    on a worker that didn't do the writes); writes keep it current after that.
+    """
+
+    def __init__(self, k: int = ROUTER_CENTROIDS):
+        self.k = k
+        self._sketches: Dict[Optional[str], _Sketch] = {}
+        self._seeded: Set[Optional[str]] = set()   # bootstrapped, or being bootstrapped
+        self._lock = threading.Lock()
+
+    def update(self, namespace: Optional[str], embeddings: Sequence[Sequence[float]]) -> None:
+        if not len(embeddings):
+            return
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            sketch = self._sketches.get(namespace)
+            if sketch is None:
+                sketch = self._sketches[namespace] = _Sketch(vectors.shape[1], self.k)
+            sketch.update(vectors)
+
+    def ensure(
+        self,
+        namespaces: Iterable[Optional[str]],
+        fetch: Callable[[Optional[str]], Sequence[Sequence[float]]],
+    ) -> None:
+        """
+        Seed the sketch of each namespace not bootstrapped yet from
+        `fetch(namespace)` (a sample of its stored embeddings), a few
+        namespaces in parallel. A failed fetch is retried on a later call.
+        """
+        with self._lock:
+            todo = [ns for ns in dict.fromkeys(namespaces) if ns not in self._seeded]
+            self._seeded.update(todo)
+        if not todo:
+            return
+
+        def seed(ns: Optional[str]) -> None:
+            try:
+                embeddings = fetch(ns)
+            except Exception:
+                with self._lock:
+                    self._seeded.discard(ns)
+                return
+            if embeddings is not None:
+                self.update(ns, embeddings)
+
+        with ThreadPoolExecutor(max_workers=min(ROUTER_BOOTSTRAP_WORKERS, len(todo))) as pool:
+            list(pool.map(seed, todo))
+
+    def namespaces(self) -> List[Optional[str]]:
+        with self._lock:
+            return list(self._sketches)
+
+    def route(
+        self,
+        query_embedding: Sequence[float],
+        n_probe: int = ROUTER_N_PROBE,
+        candidates: Optional[Sequence[Optional[str]]] = None,
+    ) -> List[Tuple[Optional[str], float]]:
+        """Top `n_probe` (namespace, score) among `candidates` (default: all known)."""
+        q = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        with self._lock:
+            pool = self._sketches if candidates is None else {
+                ns: self._sketches[ns] for ns in candidates if ns in self._sketches
+            }
+            scored = [(ns, s.score(q)) for ns, s in pool.items()]
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:n_probe]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "namespaces": len(self._sketches),
+                "k": self.k,
+                "vectors": {str(ns): int(s.counts.sum()) for ns, s in self._sketches.items()},
+            }
+
+
+_router: NamespaceRouter | None = None
+
+def get_namespace_router() -> NamespaceRouter:
+    global _router
+    if _router is None:
+        _router = NamespaceRouter()
+    return _router
@@ -1,11 +1,14 @@
-from typing import List, Optional
-from langchain_core.documents import Document
+from typing import Dict, Iterator, List, Optional, Tuple
+from pipeline.chunk import Chunk
 
 from langchain_openai import OpenAIEmbeddings
 
-from lib.chroma_connection import get_permanent_collection, get_chroma_client
+from lib.chroma_connection import get_permanent_collection, find_permanent_collection, get_chroma_client, record_first_write
+from stores.namespace_router import get_namespace_router
 import os
+import time
 from dotenv import load_dotenv
+from utils.concurrency import stage
 
 load_dotenv()  # Add this line to load environment variables
 
@@ -35,23 +38,127 @@ class PermanentVectorStore:
             self._client = get_chroma_client()
         return self._client
 
+    @staticmethod
+    def make_ids(n: int, source_id: str, start: int = 0) -> List[str]:
+        # one collection per namespace, so the source + position is unique within it
+        return [f"doc_{source_id}_{i}" for i in range(start, start + n)]
+
     def upsert(
         self,
-        chunks: List[Document],
+        chunks: List[Chunk],
+        source_id: str,
         base_collection: str = "knowledge",
         namespace: Optional[str] = None,
+        extra: Optional[dict] = None,
+        start: int = 0,             # id offset when writing a large ingest in batches
     ) -> str:
-        documents = [doc.page_content for doc in chunks]
-        metadatas = [{"namespace": namespace, **doc.metadata} for doc in chunks]
-        ids = [f"doc_{i}_{namespace or 'default'}" for i in range(len(chunks))]
+        # Chunk -> Chroma record shape happens here, at the write boundary
+        documents = [c.text for c in chunks]
+        metadatas = [{"namespace": namespace, **c.metadata(extra)} for c in chunks]
+        ids = self.make_ids(len(chunks), source_id, start)
         
-        embeddings = self.embed.embed_documents(documents)
+        with stage("embed"):
+            embeddings = self.embed.embed_documents(documents)
         
+        t0 = time.perf_counter()
         collection = get_permanent_collection(base_collection, namespace)
-        collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        with stage("store"):
+            collection.upsert(
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=metadatas,
+                ids=ids
+            )
+        record_first_write(collection.name, (time.perf_counter() - t0) * 1000)
+        # keep the cross-namespace routing centroids in step with the write
+        get_namespace_router().update(namespace, embeddings)
         return collection.name
+
+    def sample_embeddings(
+        self,
+        base_collection: str = "knowledge",
+        namespace: Optional[str] = None,
+        limit: int = 256,
+    ) -> List[List[float]]:
+        """Up to `limit` stored embeddings from the namespace (empty if it doesn't exist)."""
+        collection = find_permanent_collection(base_collection, namespace)
+        if collection is None:
+            return []
+        embeddings = collection.get(include=["embeddings"], limit=limit)["embeddings"]
+        return [] if embeddings is None else embeddings
+
+    def delete_source(
+        self,
+        source_id: str,
+        base_collection: str = "knowledge",
+        namespace: Optional[str] = None,
+    ) -> List[str]:
+        """Delete every record written for `source_id` in the namespace. Returns the deleted ids."""
+        collection = find_permanent_collection(base_collection, namespace)
+        if collection is None:
+            return []
+        with stage("store"):
+            ids = collection.get(where={"source_id": source_id}, include=[])["ids"]
+            if ids:
+                collection.delete(ids=ids)
+        return ids
+
+    def embed_query(self, text: str) -> List[float]:
+        with stage("embed"):
+            return self.embed.embed_query(text)
+
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        k: int = 10,
+        base_collection: str = "knowledge",
+        namespace: Optional[str] = None,
+    ) -> List[dict]:
+        collection = find_permanent_collection(base_collection, namespace)
+        if collection is None:
+            return []  # nothing was ever written to this namespace
+        res = collection.query(query_embeddings=[query_embedding], n_results=k)
+        return [
+            {"id": i, "score": -dist, "content": doc, "metadata": meta}
+            for i, doc, meta, dist in zip(res["ids"][0], res["documents"][0], res["metadatas"][0], res["distances"][0])
+        ]
+
+    def iter_documents(
+        self,
+        base_collection: str = "knowledge",
+        namespace: Optional[str] = None,
+        page_size: int = 1000,
+    ) -> Iterator[Tuple[str, str]]:
+        """(id, document) for every record in the namespace, paged."""
+        collection = find_permanent_collection(base_collection, namespace)
+        if collection is None:
+            return
+        offset = 0
+        while True:
+            res = collection.get(include=["documents"], limit=page_size, offset=offset)
+            yield from zip(res["ids"], res["documents"])
+            if len(res["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def get_by_ids(
+        self,
+        ids: List[str],
+        base_collection: str = "knowledge",
+        namespace: Optional[str] = None,
+    ) -> Dict[str, Tuple[str, dict]]:
+        """id -> (document, metadata) for those of `ids` that exist."""
+        collection = find_permanent_collection(base_collection, namespace)
+        if collection is None or not ids:
+            return {}
+        res = collection.get(ids=ids, include=["documents", "metadatas"])
+        return {i: (doc, meta) for i, doc, meta in zip(res["ids"], res["documents"], res["metadatas"])}
+
+    def query(
+        self,
+        text: str,
+        k: int = 10,
+        base_collection: str = "knowledge",
+        namespace: Optional[str] = None,
+    ) -> List[dict]:
+        return self.query_by_embedding(self.embed_query(text), k, base_collection, namespace)
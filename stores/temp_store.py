@@ -1,9 +1,11 @@
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
+from pipeline.chunk import Chunk
 from langchain_openai import OpenAIEmbeddings
 from lib.chroma_connection import get_temporary_collection, get_chroma_client
 import os
 from dotenv import load_dotenv
+from utils.concurrency import stage
 
 load_dotenv()  # Add this line to load environment variables
 
@@ -19,20 +21,27 @@ class SessionStore:
         )
         self.client = get_chroma_client()
 
-    def put(self, session_id: str, chunks: List[Document]) -> None:
-        documents = [doc.page_content for doc in chunks]
-        metadatas = [{"session_id": session_id, **doc.metadata} for doc in chunks]
-        ids = [f"temp_{session_id}_{i}" for i in range(len(chunks))]
+    @staticmethod
+    def make_ids(n: int, session_id: str, source_id: str, start: int = 0) -> List[str]:
+        return [f"temp_{session_id}_{source_id}_{i}" for i in range(start, start + n)]
+
+    def put(self, session_id: str, chunks: List[Chunk], source_id: str, extra: Optional[dict] = None, start: int = 0) -> None:
+        # Chunk -> Chroma record shape happens here, at the write boundary
+        documents = [c.text for c in chunks]
+        metadatas = [{"session_id": session_id, **c.metadata(extra)} for c in chunks]
+        ids = self.make_ids(len(chunks), session_id, source_id, start)
         
-        embeddings = self.embed.embed_documents(documents)
+        with stage("embed"):
+            embeddings = self.embed.embed_documents(documents)
         
         collection = get_temporary_collection()
-        collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        with stage("store"):
+            collection.upsert(
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=metadatas,
+                ids=ids
+            )
 
     def get(self, session_id: str) -> List[Document]:
         collection = get_temporary_collection()
@@ -46,6 +55,55 @@ class SessionStore:
                 documents.append(Document(page_content=doc, metadata=metadata))
         return documents
 
+    def iter_documents(self, session_id: str, page_size: int = 1000) -> Iterator[Tuple[str, str]]:
+        """(id, document) for every record in the session, paged."""
+        collection = get_temporary_collection()
+        offset = 0
+        while True:
+            res = collection.get(
+                where={"session_id": session_id},
+                include=["documents"],
+                limit=page_size,
+                offset=offset,
+            )
+            yield from zip(res["ids"], res["documents"])
+            if len(res["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def get_by_ids(self, ids: List[str]) -> Dict[str, Tuple[str, dict]]:
+        """id -> (document, metadata) for those of `ids` that exist."""
+        if not ids:
+            return {}
+        res = get_temporary_collection().get(ids=ids, include=["documents", "metadatas"])
+        return {i: (doc, meta) for i, doc, meta in zip(res["ids"], res["documents"], res["metadatas"])}
+
+    def query(self, session_id: str, text: str, k: int = 10) -> List[dict]:
+        collection = get_temporary_collection()
+        with stage("embed"):
+            query_embedding = self.embed.embed_query(text)
+        res = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=k,
+            where={"session_id": session_id}
+        )
+        return [
+            {"id": i, "score": -dist, "content": doc, "metadata": meta}
+            for i, doc, meta, dist in zip(res["ids"][0], res["documents"][0], res["metadatas"][0], res["distances"][0])
+        ]
+
+    def delete_source(self, session_id: str, source_id: str) -> List[str]:
+        """Delete the session's records for `source_id`. Returns the deleted ids."""
+        collection = get_temporary_collection()
+        with stage("store"):
+            ids = collection.get(
+                where={"$and": [{"session_id": session_id}, {"source_id": source_id}]},
+                include=[],
+            )["ids"]
+            if ids:
+                collection.delete(ids=ids)
+        return ids
+
     def clear(self, session_id: str) -> None:
         collection = get_temporary_collection()
         collection.delete(
@@ -0,0 +1,184 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+_CPUS = os.cpu_count() or 2
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+class Overloaded(Exception):
+    """Raised when a request can't be admitted or a stage slot isn't free in time."""
+
+    def __init__(self, what: str, retry_after: int):
+        super().__init__(f"{what} is at capacity")
+        self.what = what
+        self.retry_after = retry_after
+
+
+class _Gate:
+    """
+    Counting semaphore that keeps queue-depth and wait-time metrics.
+    `max_waiting` caps the queue (None = unbounded); `timeout` caps each wait.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: Optional[int] = None, timeout: Optional[float] = None):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.busy_total_s = 0.0
+
+    def _retry_after(self) -> int:
+        # rough: one average service time per batch of `limit` requests ahead of us
+        avg = self.busy_total_s / self.admitted if self.admitted else 1.0
+        return max(1, math.ceil(avg * (self.waiting + 1) / self.limit))
+
+    def acquire(self) -> float:
+        """Block for a slot (or raise Overloaded). Returns the start time to pass to release()."""
+        t0 = time.perf_counter()
+        with self._cond:
+            if self.active >= self.limit and self.max_waiting is not None and self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise Overloaded(self.name, self._retry_after())
+            self.waiting += 1
+            try:
+                ok = self._cond.wait_for(lambda: self.active < self.limit, timeout=self.timeout)
+            finally:
+                self.waiting -= 1
+            if not ok:
+                self.rejected += 1
+                raise Overloaded(self.name, self._retry_after())
+            self.active += 1
+            waited = time.perf_counter() - t0
+            self.admitted += 1
+            self.wait_total_s += waited
+            self.wait_max_s = max(self.wait_max_s, waited)
+        return time.perf_counter()
+
+    def release(self, started: float) -> None:
+        # may run on another thread than acquire() (e.g. a future's done callback)
+        with self._cond:
+            self.active -= 1
+            self.busy_total_s += time.perf_counter() - started
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        started = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "queue_capacity": self.max_waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_wait_ms": (self.wait_total_s / self.admitted * 1000) if self.admitted else 0.0,
+                "max_wait_ms": self.wait_max_s * 1000,
+            }
+
+
+class _AsyncGate(_Gate):
+    """
+    _Gate for the event loop: waiters await an asyncio.Condition instead of
+    parking a threadpool thread, so a full queue costs no worker threads.
+    Counters are only changed on the loop; stats() may read them from anywhere.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_cond: asyncio.Condition | None = None  # bound to the running loop on first use
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._async_cond is None:
+            self._async_cond = asyncio.Condition()
+        cond = self._async_cond
+        t0 = time.perf_counter()
+        async with cond:
+            if self.active >= self.limit and self.max_waiting is not None and self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise Overloaded(self.name, self._retry_after())
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(cond.wait_for(lambda: self.active < self.limit), self.timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise Overloaded(self.name, self._retry_after())
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            waited = time.perf_counter() - t0
+            self.admitted += 1
+            self.wait_total_s += waited
+            self.wait_max_s = max(self.wait_max_s, waited)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            async with cond:
+                self.active -= 1
+                self.busy_total_s += time.perf_counter() - started
+                cond.notify()
+
+
+# Per-stage limits: CPU-bound stages default to core count, I/O-bound ones higher.
+STAGE_WAIT_TIMEOUT = float(os.getenv("STAGE_WAIT_TIMEOUT", "120"))  # seconds
+_stages: Dict[str, _Gate] = {
+    "ocr": _Gate("ocr", _env_int("LIMIT_OCR", _CPUS), timeout=STAGE_WAIT_TIMEOUT),
+    "pdf": _Gate("pdf", _env_int("LIMIT_PDF", _CPUS), timeout=STAGE_WAIT_TIMEOUT),
+    "embed": _Gate("embed", _env_int("LIMIT_EMBED", 8), timeout=STAGE_WAIT_TIMEOUT),
+    "store": _Gate("store", _env_int("LIMIT_STORE", 16), timeout=STAGE_WAIT_TIMEOUT),
+}
+
+# Whole-request admission: this many ingests run at once, this many more may queue.
+# Queued requests wait on the event loop; only admitted ones take a threadpool
+# thread, so keep INGEST_MAX_INFLIGHT below the threadpool size (40 by default).
+_admission = _AsyncGate(
+    "ingest",
+    _env_int("INGEST_MAX_INFLIGHT", 16),
+    max_waiting=_env_int("INGEST_QUEUE_CAPACITY", 32),
+    timeout=float(os.getenv("INGEST_QUEUE_TIMEOUT", "30")),
+)
+
+
+def stage(name: str):
+    """`with stage("ocr"): ...` — blocks until the stage has a free slot."""
+    return _stages[name].slot()
+
+
+def stage_gate(name: str) -> _Gate:
+    """The gate behind stage(name), for slots held across threads (acquire/release)."""
+    return _stages[name]
+
+
+def admit():
+    """`async with admit(): ...` — raises Overloaded if the ingest queue is full or the wait times out."""
+    return _admission.slot()
+
+
+def concurrency_stats() -> dict:
+    return {
+        "admission": _admission.stats(),
+        "stages": {name: g.stats() for name, g in _stages.items()},
+    }
@@ -2,7 +2,8 @@
 import os
 import re
 import sys
-from typing import Optional
+import zipfile
+from typing import Optional, Tuple
 
 # Config: default OFF on Windows (can enable via env)
 USE_LIBMAGIC: bool = os.getenv("SNIFFER_USE_LIBMAGIC", "").lower() in {"1", "true", "yes"}
@@ -15,7 +16,19 @@ IMAGE_MAGIC = {
     b"\x89PNG\r\n\x1a\n": "png",        # PNG
     b"GIF87a": "gif",                   # GIF87a
     b"GIF89a": "gif",                   # GIF89a
+    b"II*\x00": "tiff",                 # TIFF little-endian
+    b"MM\x00*": "tiff",                 # TIFF big-endian
 }
+ZIP_HEADER = b"PK\x03\x04"
+# Longest first so UTF-8's BOM isn't shadowed; UTF-32 is rare enough to skip
+TEXT_BOMS = (
+    (b"\xEF\xBB\xBF", "utf-8-sig"),
+    (b"\xFF\xFE", "utf-16"),
+    (b"\xFE\xFF", "utf-16"),
+)
+HTML_MARKERS = ("<!doctype html", "<html", "<head", "<body")
+# OOXML: the first path segment of the package parts tells the format apart
+OOXML_PARTS = {"word/": "docx", "ppt/": "pptx", "xl/": "xlsx"}
 URL_RE = re.compile(r"^https?://", re.I)
 
 
@@ -23,10 +36,41 @@ def is_url(s: str) -> bool:
     return bool(URL_RE.match(s))
 
 
+def _is_webp(b: bytes) -> bool:
+    return len(b) >= 12 and b[:4] == b"RIFF" and b[8:12] == b"WEBP"
+
+
+def _is_bmp(b: bytes) -> bool:
+    # "BM" alone is too weak (plain text can start with it); check the DIB header size too
+    return len(b) >= 18 and b[:2] == b"BM" and int.from_bytes(b[14:18], "little") in {12, 40, 52, 56, 64, 108, 124}
+
+
+def sniff_text_encoding(b: bytes) -> Optional[str]:
+    """Encoding implied by a byte-order mark, if any."""
+    for bom, enc in TEXT_BOMS:
+        if b.startswith(bom):
+            return enc
+    return None
+
+
+def _decode_head(b: bytes) -> str:
+    enc = sniff_text_encoding(b) or "utf-8"
+    if enc == "utf-16" and len(b) % 2:
+        b = b[:-1]  # head may cut a code unit in half
+    return b.decode(enc, errors="ignore")
+
+
+def _looks_like_html(s: str) -> bool:
+    head = s.lstrip("\ufeff \t\r\n")[:1024].lower()
+    if head.startswith("<?xml"):
+        head = head[head.find("?>") + 2:].lstrip()
+    return any(m in head for m in HTML_MARKERS)
+
+
 def _looks_like_text(b: bytes, min_ratio: float = 0.85) -> bool:
     if not b:
         return False
-    s = b.decode("utf-8", errors="ignore")
+    s = _decode_head(b)
     if not s:
         return False
     printable = sum(ch.isprintable() or ch.isspace() for ch in s)
@@ -36,7 +80,7 @@ def _looks_like_text(b: bytes, min_ratio: float = 0.85) -> bool:
 def sniff_bytes(file_bytes: bytes) -> Optional[str]:
     """
     Detect file type from raw bytes.
-    Returns: "pdf" | "image/<ext>" | "text" | None
+    Returns: "pdf" | "image/<ext>" | "zip" | "html" | "text" | None
     """
     # 1) Fast signatures
     if file_bytes.startswith(PDF_HEADER):
@@ -44,6 +88,12 @@ def sniff_bytes(file_bytes: bytes) -> Optional[str]:
     for sig, ext in IMAGE_MAGIC.items():
         if file_bytes.startswith(sig):
             return f"image/{ext}"
+    if _is_webp(file_bytes):
+        return "image/webp"
+    if _is_bmp(file_bytes):
+        return "image/bmp"
+    if file_bytes.startswith(ZIP_HEADER):
+        return "zip"
 
     # 2) Optional libmagic path (lazy import, guarded)
     if USE_LIBMAGIC:
@@ -62,6 +112,34 @@ def sniff_bytes(file_bytes: bytes) -> Optional[str]:
 
     # 3) Fallback heuristic
     if _looks_like_text(file_bytes):
-        return "text"
+        return "html" if _looks_like_html(_decode_head(file_bytes)) else "text"
 
     return None
+
+
+def _sniff_zip(path: str) -> str:
+    try:
+        with zipfile.ZipFile(path) as zf:
+            names = zf.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return "zip"
+    if "[Content_Types].xml" in names:
+        for prefix, kind in OOXML_PARTS.items():
+            if any(n.startswith(prefix) for n in names):
+                return kind
+    return "zip"
+
+
+def sniff_file(path: str, head_size: int = 8192) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Detect a file's type from its content. Like sniff_bytes, but reads enough
+    to recognise HTML and looks inside ZIP containers.
+    Returns (kind, text_encoding): kind is "docx" | "pptx" | "xlsx" for OOXML,
+    otherwise as sniff_bytes; text_encoding is set from a BOM when present.
+    """
+    with open(path, "rb") as f:
+        head = f.read(head_size)
+    kind = sniff_bytes(head)
+    if kind == "zip":
+        kind = _sniff_zip(path)
+    return kind, sniff_text_encoding(head)
@@ -0,0 +1,124 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Opt-in only: a request is profiled when it carries `X-Profile: 1` together with
+# a valid `X-Admin-Token`, or when it falls into the random sample.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+_profiles: "deque[dict]" = deque(maxlen=PROFILE_KEEP)
+_profiles_lock = threading.Lock()
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token == ADMIN_TOKEN
+
+
+def should_profile(profile_header: Optional[str], admin_token: Optional[str]) -> bool:
+    if profile_header and profile_header.lower() in {"1", "true", "yes"} and is_admin(admin_token):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler for one thread. A daemon thread reads the
+    target's current frame every `interval_ms` and counts collapsed stacks
+    ("outer;inner;leaf"), the input format for flamegraph tools.
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_profiled(
+    fn: Callable[[], T],
+    context: Optional[Dict] = None,
+    describe: Optional[Callable[[T], Dict]] = None,
+) -> Tuple[T, str]:
+    """
+    Run fn() under the sampler and store the profile. Returns (result, profile_id).
+    `context` is stored as-is; `describe(result)` adds fields known only afterwards.
+    A failing call is still recorded, with its error, before re-raising.
+    """
+    sampler = StackSampler(threading.get_ident())
+    profile_id = uuid.uuid4().hex
+    error = None
+    extra: Dict = {}
+    t0 = time.perf_counter()
+    sampler.start()
+    try:
+        result = fn()
+        if describe:
+            extra = describe(result)
+        return result, profile_id
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        sampler.stop()
+        record = {
+            "id": profile_id,
+            "created_at": time.time(),
+            "duration_ms": (time.perf_counter() - t0) * 1000,
+            "interval_ms": sampler.interval * 1000,
+            "samples": sampler.samples,
+            "error": error,
+            **(context or {}),
+            **extra,
+            "stacks": dict(sampler.stacks.most_common()),
+        }
+        with _profiles_lock:
+            _profiles.append(record)
+
+
+def list_profiles() -> list[dict]:
+    with _profiles_lock:
+        return [{k: v for k, v in p.items() if k != "stacks"} for p in reversed(_profiles)]
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    with _profiles_lock:
+        for p in _profiles:
+            if p["id"] == profile_id:
+                return p
+    return None
+
+
+def collapsed(profile: dict) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in profile["stacks"].items())